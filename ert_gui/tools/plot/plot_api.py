@@ -67,6 +67,10 @@ class PlotApi(object):
         except ValueError:
             return data
 
+    def data_for_cases(self, cases, key):
+        """ Returns a dict from case name to the DataFrame returned by data_for_key """
+        return {case: self.data_for_key(case, key) for case in cases}
+
     def observations_for_obs_keys(self, case, obs_keys):
         """ Returns a pandas DataFrame with the datapoints for a given observation key for a given case. The row index
             is the realization number, and the column index is a multi-index with (obs_key, index/date, obs_index),
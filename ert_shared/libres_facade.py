@@ -141,6 +141,29 @@ class LibresFacade(object):
 
         return data
 
+    def gather_all_summary_data(self, case, keys=None):
+        """ Load the summary data for all `keys`, or for every summary key, in
+        one pass over the summary files of the case.
+        :rtype: dict of key to pandas.DataFrame, as returned by gather_summary_data """
+        data = SummaryCollector.loadAllSummaryData(self._enkf_main, case, keys)
+        gathered = {}
+        if not data.empty:
+            data = data.reset_index()
+
+            if any(data.duplicated()):
+                print("** Warning: The simulation data contains duplicate "
+                      "timestamps. A possible explanation is that your "
+                      "simulation timestep is less than a second.")
+                data = data.drop_duplicates()
+
+            # One pivot for all keys gives (key, realization) columns
+            data = data.pivot(index="Date", columns="Realization")
+            gathered = {key: data[key] for key in data.columns.get_level_values(0).unique()}
+
+        if keys is None:
+            return gathered
+        return {key: gathered.get(key, DataFrame()) for key in keys}
+
     def has_refcase(self, key):
         refcase = self._enkf_main.eclConfig().getRefcase()
         return refcase is not None and key in refcase
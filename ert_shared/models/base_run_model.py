@@ -1,5 +1,6 @@
 import time
 import logging
+from contextlib import contextmanager
 from res.job_queue import JobStatusType
 from res.job_queue import ForwardModelStatus
 from res.util import ResLog
@@ -82,6 +83,34 @@ class BaseRunModel(object):
 
         self._run_context = None #delete last active run_context to notify fs_manager that storage is not being written to
 
+    def _wait_for_extraction(self, extraction_worker):
+        """Wait for the storage extraction running in the background and fail
+        the run if it failed"""
+        pending = extraction_worker.pending()
+        if pending > 0:
+            self.setPhaseName("Writing %d case%s to storage..." % (pending, 's' if pending != 1 else ''), indeterminate=True)
+        try:
+            extraction_worker.join()
+        except Exception as e:
+            logging.exception("Storage extraction failed")
+            raise ErtRunError("Storage extraction failed: %s" % str(e))
+
+    @contextmanager
+    def _extracting(self, extraction_worker):
+        """Wait for the storage extraction when the block is done. If the block
+        fails, the writes already queued are still waited for and their errors
+        logged, so they don't go on in the background, before the original
+        error propagates"""
+        try:
+            yield extraction_worker
+        except BaseException:
+            try:
+                extraction_worker.join()
+            except Exception:
+                logging.exception("Storage extraction failed")
+            raise
+        self._wait_for_extraction(extraction_worker)
+
     def runSimulations(self, job_queue, run_context):
         raise NotImplementedError("Method must be implemented by inheritors!")
 
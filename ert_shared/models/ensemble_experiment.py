@@ -33,7 +33,9 @@ class EnsembleExperiment(BaseRunModel):
         EnkfSimulationRunner.runWorkflows(HookRuntime.POST_SIMULATION, ERT.ert)
         self.setPhase(1, "Simulations completed.") # done...
 
-        dump_to_new_storage()
+        # Restarting failed realizations appends to the ensemble that was
+        # stored by the previous run
+        dump_to_new_storage(incremental="prev_successful_realizations" in arguments)
 
         return run_context
 
@@ -3,7 +3,7 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 from ert_shared.models import BaseRunModel, ErtRunError
 from ert_shared import ERT
 
-from ert_shared.storage.extraction_api import dump_to_new_storage
+from ert_shared.storage.extraction_api import ExtractionWorker
 class IteratedEnsembleSmoother(BaseRunModel):
 
     def __init__(self):
@@ -77,30 +77,31 @@ class IteratedEnsembleSmoother(BaseRunModel):
         current_iter = 0
 
         previous_ensemble_name = None
-        while current_iter < ERT.enkf_facade.get_number_of_iterations() and num_retries < num_retries_per_iteration:
-            pre_analysis_iter_num = analysis_module.getInt("ITER")
-            # We run the PRE_FIRST_UPDATE hook here because the current_iter is explicitly available, versus
-            # in the run_context inside analyzeStep
-            if current_iter == 0:
-                EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_FIRST_UPDATE, ert=ERT.ert)
-            self.analyzeStep(run_context)
-            current_iter = analysis_module.getInt("ITER")
-
-            analysis_success = current_iter > pre_analysis_iter_num
-            if analysis_success:
-                analysis_module_name = self.ert().analysisConfig().activeModuleName()
-                previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
-                run_context = self.create_context( arguments, current_iter, prior_context = run_context )
-                self.ert().getEnkfFsManager().switchFileSystem(run_context.get_target_fs())
-                self._runAndPostProcess(run_context)
-                num_retries = 0
-            else:
-                run_context = self.create_context( arguments, current_iter, prior_context = run_context , rerun = True)
-                self._runAndPostProcess(run_context)
-                num_retries += 1
-
-        analysis_module_name = self.ert().analysisConfig().activeModuleName()
-        previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+        with self._extracting(ExtractionWorker()) as extraction_worker:
+            while current_iter < ERT.enkf_facade.get_number_of_iterations() and num_retries < num_retries_per_iteration:
+                pre_analysis_iter_num = analysis_module.getInt("ITER")
+                # We run the PRE_FIRST_UPDATE hook here because the current_iter is explicitly available, versus
+                # in the run_context inside analyzeStep
+                if current_iter == 0:
+                    EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_FIRST_UPDATE, ert=ERT.ert)
+                self.analyzeStep(run_context)
+                current_iter = analysis_module.getInt("ITER")
+
+                analysis_success = current_iter > pre_analysis_iter_num
+                if analysis_success:
+                    analysis_module_name = self.ert().analysisConfig().activeModuleName()
+                    previous_ensemble_name = extraction_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+                    run_context = self.create_context( arguments, current_iter, prior_context = run_context )
+                    self.ert().getEnkfFsManager().switchFileSystem(run_context.get_target_fs())
+                    self._runAndPostProcess(run_context)
+                    num_retries = 0
+                else:
+                    run_context = self.create_context( arguments, current_iter, prior_context = run_context , rerun = True)
+                    self._runAndPostProcess(run_context)
+                    num_retries += 1
+
+            analysis_module_name = self.ert().analysisConfig().activeModuleName()
+            previous_ensemble_name = extraction_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
         if current_iter == (phase_count - 1):
             self.setPhase(phase_count, "Simulations completed.")
         else:
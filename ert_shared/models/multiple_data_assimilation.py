@@ -19,7 +19,7 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 
 from ert_shared.models import BaseRunModel, ErtRunError
 from ert_shared import ERT
-from ert_shared.storage.extraction_api import dump_to_new_storage
+from ert_shared.storage.extraction_api import ExtractionWorker
 import logging
 logger = logging.getLogger(__file__)
 class MultipleDataAssimilation(BaseRunModel):
@@ -59,29 +59,30 @@ class MultipleDataAssimilation(BaseRunModel):
 
         run_context = None
         previous_ensemble_name = None
-        enumerated_weights = list(enumerate(weights))
-        weights_to_run = enumerated_weights[min(arguments["start_iteration"], len(weights)):]
-        for iteration, weight in weights_to_run:
-            is_first_iteration = iteration == 0
-            run_context = self.create_context( arguments , iteration,  initialize_mask_from_arguments=is_first_iteration)
+        with self._extracting(ExtractionWorker()) as extraction_worker:
+            enumerated_weights = list(enumerate(weights))
+            weights_to_run = enumerated_weights[min(arguments["start_iteration"], len(weights)):]
+            for iteration, weight in weights_to_run:
+                is_first_iteration = iteration == 0
+                run_context = self.create_context( arguments , iteration,  initialize_mask_from_arguments=is_first_iteration)
+                self._simulateAndPostProcess(run_context, arguments)
+                if is_first_iteration:
+                    EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_FIRST_UPDATE, ert=ERT.ert)
+                EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_UPDATE, ert=ERT.ert)
+                self.update(run_context , weight)
+                EnkfSimulationRunner.runWorkflows(HookRuntime.POST_UPDATE, ert=ERT.ert)
+                analysis_module_name = self.ert().analysisConfig().activeModuleName()
+                previous_ensemble_name = extraction_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+
+            self.setPhaseName("Post processing...", indeterminate=True)
+            run_context = self.create_context( arguments , len(weights),  initialize_mask_from_arguments=False, update = False)
             self._simulateAndPostProcess(run_context, arguments)
-            if is_first_iteration:
-                EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_FIRST_UPDATE, ert=ERT.ert)
-            EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_UPDATE, ert=ERT.ert)
-            self.update(run_context , weight)
-            EnkfSimulationRunner.runWorkflows(HookRuntime.POST_UPDATE, ert=ERT.ert)
-            analysis_module_name = self.ert().analysisConfig().activeModuleName()
-            previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
 
-        self.setPhaseName("Post processing...", indeterminate=True)
-        run_context = self.create_context( arguments , len(weights),  initialize_mask_from_arguments=False, update = False)
-        self._simulateAndPostProcess(run_context, arguments)
+            analysis_module_name = self.ert().analysisConfig().activeModuleName()
+            previous_ensemble_name = extraction_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
 
         self.setPhase(iteration_count + 2, "Simulations completed.")
 
-        analysis_module_name = self.ert().analysisConfig().activeModuleName()
-        previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
-
         return run_context
 
     def count_active_realizations(self, run_context):
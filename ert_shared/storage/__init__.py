@@ -4,11 +4,55 @@ from pathlib import Path
 
 from ert_shared.storage.blobs_model import Blobs
 from ert_shared.storage.entities_model import Entities
+from sqlalchemy import event, text
 from sqlalchemy.engine import create_engine
 from sqlalchemy.orm import sessionmaker
 
-import alembic
-from alembic import config
+# Latest migration of each database. Databases at these revisions are opened
+# without loading alembic. Update together with new migrations.
+ALEMBIC_HEADS = {
+    "alembic_rdb": "25d76a07ec4b",
+    "alembic_blob": "8c1be3d1588a",
+}
+
+# PRAGMAs set on every new SQLite connection, by profile name
+ENGINE_PROFILES = {
+    # SQLite defaults with a rollback journal. Safe on network file systems.
+    "default": {},
+    # Write-ahead logging lets the storage server read while the run model
+    # writes the next iteration. WAL requires a local file system.
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 ** 2,
+        "cache_size": -64 * 1024,  # Negative values are in KiB
+        "busy_timeout": 30000,  # Milliseconds
+    },
+}
+
+
+def _create_engine(url, profile="default"):
+    pragmas = ENGINE_PROFILES[profile]
+    engine = create_engine(url)
+    if pragmas and engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas.items():
+                cursor.execute("PRAGMA {}={}".format(pragma, value))
+            cursor.close()
+
+    return engine
+
+
+def _current_revisions(connection):
+    """Return the revisions stored in `alembic_version`, or an empty set for
+    a database that has not been migrated"""
+    if not connection.dialect.has_table(connection, "alembic_version"):
+        return set()
+    rows = connection.execute(text("SELECT version_num FROM alembic_version"))
+    return {row[0] for row in rows}
 
 
 class ErtStorage:
@@ -16,7 +60,7 @@ class ErtStorage:
         self.rdb_url = None
         self.blob_url = None
 
-    def initialize(self, rdb_url=None, blob_url=None):
+    def initialize(self, rdb_url=None, blob_url=None, engine_profile="default"):
         if rdb_url == None:
             rdb_url = "sqlite:///{}/entities.db".format(os.getcwd())
         if blob_url == None:
@@ -24,21 +68,41 @@ class ErtStorage:
 
         self.rdb_url = rdb_url
         self.blob_url = blob_url
-        rdb_engine = create_engine(rdb_url)
-        blob_engine = create_engine(blob_url)
+        self.engine_profile = engine_profile
+        rdb_engine, blob_engine = self._create_sessions()
+
+        with rdb_engine.connect() as connection:
+            self._upgrade_database(
+                connection=connection, ini_section="alembic_rdb", url=self.rdb_url
+            )
+        with blob_engine.connect() as connection:
+            self._upgrade_database(
+                connection=connection, ini_section="alembic_blob", url=self.blob_url
+            )
+
+    def _create_sessions(self):
+        rdb_engine = _create_engine(self.rdb_url, self.engine_profile)
+        blob_engine = _create_engine(self.blob_url, self.engine_profile)
         self.RdbSession = sessionmaker(bind=rdb_engine)
         self.BlobSession = sessionmaker(bind=blob_engine)
+        return rdb_engine, blob_engine
 
-        self._upgrade_database(
-            connection=rdb_engine.connect(), ini_section="alembic_rdb", url=self.rdb_url
-        )
-        self._upgrade_database(
-            connection=blob_engine.connect(),
-            ini_section="alembic_blob",
-            url=self.blob_url,
-        )
+    def reconnect(self):
+        """Create new engines for an initialized storage. Must be called in
+        forked processes, so they don't share database connections with the
+        parent."""
+        self._create_sessions()
 
     def _upgrade_database(self, connection, ini_section, url, revision="head"):
+        if revision == "head" and _current_revisions(connection) == {
+            ALEMBIC_HEADS[ini_section]
+        }:
+            return
+
+        # Importing alembic and loading the migration scripts is slow, so it
+        # is only done when there is something to migrate
+        from alembic import command, config
+
         dirname = os.path.dirname(os.path.abspath(__file__))
 
         script_location = os.path.join(dirname, "alembic", ini_section)
@@ -48,7 +112,7 @@ class ErtStorage:
         cfg.set_section_option(ini_section, "sqlalchemy.url", url)
         cfg.set_section_option(ini_section, "script_location", script_location)
         cfg.attributes["connection"] = connection
-        alembic.command.upgrade(config=cfg, revision=revision)
+        command.upgrade(config=cfg, revision=revision)
 
 
 ERT_STORAGE = ErtStorage()
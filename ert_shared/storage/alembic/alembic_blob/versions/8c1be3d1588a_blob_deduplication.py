@@ -0,0 +1,80 @@
+"""Blob deduplication
+
+Revision ID: 8c1be3d1588a
+Revises: 901422e6c666
+Create Date: 2020-11-09 13:40:12.904113
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c1be3d1588a"
+down_revision = "901422e6c666"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+ert_blob = sa.table(
+    "ert_blob",
+    sa.column("id", sa.Integer),
+    sa.column("data", sa.LargeBinary),
+    sa.column("digest", sa.String),
+)
+
+
+def _digest(payload):
+    # Frozen copy of `ert_shared.storage.blob_encoding.digest`
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _add_digests():
+    # Existing duplicates are referenced by id from the entities database, so
+    # they are kept as separate rows. New blobs share the first of them.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([ert_blob.c.id, ert_blob.c.data])
+            .where(ert_blob.c.id > last_id)
+            .order_by(ert_blob.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        params = [
+            {"_id": id_, "_digest": _digest(data)}
+            for id_, data in rows
+            if data is not None
+        ]
+        if params:
+            connection.execute(
+                ert_blob.update()
+                .where(ert_blob.c.id == sa.bindparam("_id"))
+                .values(digest=sa.bindparam("_digest")),
+                params,
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table("ert_blob") as batch_op:
+        batch_op.add_column(sa.Column("digest", sa.String(length=64), nullable=True))
+        batch_op.add_column(
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="1")
+        )
+        batch_op.create_index(
+            batch_op.f("ix_ert_blob_digest"), ["digest"], unique=False
+        )
+    _add_digests()
+
+
+def downgrade():
+    with op.batch_alter_table("ert_blob") as batch_op:
+        batch_op.drop_index(batch_op.f("ix_ert_blob_digest"))
+        batch_op.drop_column("ref_count")
+        batch_op.drop_column("digest")
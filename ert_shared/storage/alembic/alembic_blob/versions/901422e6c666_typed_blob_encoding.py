@@ -0,0 +1,146 @@
+"""Typed blob encoding
+
+Revision ID: 901422e6c666
+Revises: a360248166fd
+Create Date: 2020-11-02 10:12:31.418207
+
+"""
+import datetime
+import pickle
+import struct
+import zlib
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "901422e6c666"
+down_revision = "a360248166fd"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# A frozen copy of version 1 of `ert_shared.storage.blob_encoding`, so this
+# revision keeps producing the same payloads when that module changes
+MAGIC = b"ERTB"
+VERSION = 1
+
+FLAG_COMPRESSED = 0x1
+FLAG_PICKLED = 0x2
+
+_HEADER = struct.Struct("<4sBBBB")
+_ALIGNMENT = 8
+
+_DATE_TYPES = (datetime.date, np.datetime64)
+
+ert_blob = sa.table(
+    "ert_blob",
+    sa.column("id", sa.Integer),
+    sa.column("data", sa.LargeBinary),
+)
+
+
+def _to_array(data):
+    """Return `data` as a little-endian array, or None if the array would not
+    decode back to `data`, e.g. for ragged lists or lists that mix types or
+    contain None"""
+    if isinstance(data, np.ndarray) and data.dtype.kind != "O":
+        array = data
+    else:
+        try:
+            objects = np.array(data, dtype=object)
+        except ValueError:
+            return None
+        types = {type(value) for value in objects.flat}
+        if types and all(issubclass(type_, _DATE_TYPES) for type_ in types):
+            array = objects.astype("datetime64[us]")
+        elif len(types) > 1:
+            return None
+        else:
+            try:
+                array = np.asarray(data)
+            except ValueError:
+                return None
+            if array.dtype.kind == "O":
+                return None
+    if array.dtype.kind == "M":
+        array = array.astype("datetime64[us]")
+    return array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+
+def _encode(data):
+    flags = 0
+    array = _to_array(data)
+    if array is None:
+        flags |= FLAG_PICKLED
+        body = pickle.dumps(data)
+        dtype = "|O"
+        shape = ()
+    else:
+        body = array.tobytes(order="C")
+        dtype = array.dtype.str
+        shape = array.shape
+
+    dtype = dtype.encode("ascii")
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(dtype), len(shape))
+    header += dtype + struct.pack("<{}Q".format(len(shape)), *shape)
+    header += b"\0" * (-len(header) % _ALIGNMENT)
+    return header + body
+
+
+def _decode(payload):
+    magic, version, flags, dtlen, ndim = _HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version {} ERT blob payload".format(VERSION))
+
+    offset = _HEADER.size
+    dtype = bytes(payload[offset : offset + dtlen]).decode("ascii")
+    offset += dtlen
+    shape = struct.unpack_from("<{}Q".format(ndim), payload, offset)
+    offset += 8 * ndim
+    offset += -offset % _ALIGNMENT
+
+    body = memoryview(payload)[offset:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    if flags & FLAG_PICKLED:
+        return pickle.loads(body)
+    return np.frombuffer(body, dtype=np.dtype(dtype)).reshape(shape).tolist()
+
+
+def _convert(convert):
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([ert_blob.c.id, ert_blob.c.data])
+            .where(ert_blob.c.id > last_id)
+            .order_by(ert_blob.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        params = [
+            {"_id": id_, "_data": convert(data)}
+            for id_, data in rows
+            if data is not None
+        ]
+        if params:
+            connection.execute(
+                ert_blob.update()
+                .where(ert_blob.c.id == sa.bindparam("_id"))
+                .values(data=sa.bindparam("_data")),
+                params,
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    _convert(lambda data: _encode(pickle.loads(data)))
+
+
+def downgrade():
+    _convert(lambda data: pickle.dumps(_decode(data)))
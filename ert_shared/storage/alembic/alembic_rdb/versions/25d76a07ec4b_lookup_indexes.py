@@ -0,0 +1,57 @@
+"""Lookup indexes
+
+Revision ID: 25d76a07ec4b
+Revises: 14eca8adc993
+Create Date: 2020-11-04 13:21:09.511237
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "25d76a07ec4b"
+down_revision = "14eca8adc993"
+branch_labels = None
+depends_on = None
+
+# Indexes on the foreign keys and lookup columns that are not already covered
+# by the leftmost columns of a unique constraint
+INDEXES = [
+    ("ix_update_ensemble_reference_id", "update", ["ensemble_reference_id"]),
+    ("ix_realization_ensemble_id", "realization", ["ensemble_id"]),
+    ("ix_response_definition_ensemble_id", "response_definition", ["ensemble_id"]),
+    ("ix_response_response_definition_id", "response", ["response_definition_id"]),
+    (
+        "ix_prior_ensemble_association_table_ensemble_id",
+        "prior_ensemble_association_table",
+        ["ensemble_id"],
+    ),
+    ("ix_parameter_prior_group_key", "parameter_prior", ["group", "key"]),
+    ("ix_parameter_definition_ensemble_id", "parameter_definition", ["ensemble_id"]),
+    (
+        "ix_parameter_parameter_definition_id",
+        "parameter",
+        ["parameter_definition_id"],
+    ),
+    (
+        "ix_observation_response_definition_link_observation_id",
+        "observation_response_definition_link",
+        ["observation_id"],
+    ),
+    (
+        "ix_misfit_observation_response_definition_link_id",
+        "misfit",
+        ["observation_response_definition_link_id"],
+    ),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(op.f(name), table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(op.f(name), table_name=table)
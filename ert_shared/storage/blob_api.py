@@ -1,6 +1,9 @@
+from collections import Counter
+
+from ert_shared.storage import blob_encoding
 from ert_shared.storage.blobs_model import ErtBlob
 from sqlalchemy import create_engine
-from sqlalchemy.orm import Bundle
+from sqlalchemy.orm import Bundle, load_only
 from sqlalchemy.orm.session import Session
 
 
@@ -8,22 +11,111 @@ class BlobApi:
     def __init__(self, session):
         self._session = session
 
-    def add_blob(self, data):
-        data_frame = ErtBlob(data=data)
-        self._session.add(data_frame)
+    # SQLite limits the number of bound parameters in a statement
+    QUERY_CHUNK_SIZE = 500
+
+    def add_blob(self, data, compress=False):
+        """Add a blob, or take a new reference to an existing blob with the
+        same content"""
+        payload = blob_encoding.encode(data, compress=compress)
+        blob = (
+            self._session.query(ErtBlob)
+            .filter(ErtBlob.digest == blob_encoding.digest(payload))
+            .first()
+        )
+        if blob is not None:
+            blob.ref_count += 1
+        else:
+            blob = ErtBlob(payload=payload, ref_count=1)
+            self._session.add(blob)
+        self._session.flush()
+        return blob
+
+    def add_blobs(self, datas, compress=False):
+        """Add many blobs at once and return their ids, in the same order as
+        `datas`. Payloads that are already stored, or occur more than once in
+        `datas`, share a single blob."""
+        payloads = {}
+        digests = []
+        for data in datas:
+            payload = blob_encoding.encode(data, compress=compress)
+            digest = blob_encoding.digest(payload)
+            payloads.setdefault(digest, payload)
+            digests.append(digest)
+        counts = Counter(digests)
+
+        ids = {}
+        unique_digests = list(payloads)
+        for start in range(0, len(unique_digests), self.QUERY_CHUNK_SIZE):
+            chunk = unique_digests[start : start + self.QUERY_CHUNK_SIZE]
+            existing = (
+                self._session.query(ErtBlob)
+                .options(load_only("id", "digest", "ref_count"))
+                .filter(ErtBlob.digest.in_(chunk))
+            )
+            for blob in existing:
+                if blob.digest not in ids:
+                    blob.ref_count += counts[blob.digest]
+                    ids[blob.digest] = blob.id
+        self._session.flush()
+
+        # Insert the new blobs with a single executemany, which SQLAlchemy only
+        # does when it doesn't have to return the generated ids, and look the
+        # ids up by digest afterwards
+        new_digests = [digest for digest in unique_digests if digest not in ids]
+        self._session.bulk_insert_mappings(
+            ErtBlob,
+            [
+                {
+                    "payload": payloads[digest],
+                    "digest": digest,
+                    "ref_count": counts[digest],
+                }
+                for digest in new_digests
+            ],
+        )
+        for start in range(0, len(new_digests), self.QUERY_CHUNK_SIZE):
+            chunk = new_digests[start : start + self.QUERY_CHUNK_SIZE]
+            ids.update(
+                self._session.query(ErtBlob.digest, ErtBlob.id)
+                .filter(ErtBlob.digest.in_(chunk))
+                .order_by(ErtBlob.id)
+            )
+        return [ids[digest] for digest in digests]
+
+    def delete_blob(self, id):
+        """Release a reference to the blob, deleting it when it was the last
+        one"""
+        blob = self.get_blob(id)
+        blob.ref_count -= 1
+        if blob.ref_count <= 0:
+            self._session.delete(blob)
         self._session.flush()
-        return data_frame
 
     def get_blob(self, id):
         return self._session.query(ErtBlob).get(id)
 
-    def get_blobs(self, ids):
+    def get_blobs(self, ids, chunk_size=None):
+        """Yield the blobs with the given ids, in the order of `ids`. An id may
+        occur more than once, and ids without a blob are skipped.
+
+        The blobs are fetched with one query per `chunk_size` ids (default
+        QUERY_CHUNK_SIZE), so only one chunk is held in memory at a time.
+
+        """
         if not isinstance(ids, list):
             ids = [ids]
+        if chunk_size is None:
+            chunk_size = self.QUERY_CHUNK_SIZE
 
-        return (
-            self._session.query(ErtBlob)
-            .filter(ErtBlob.id.in_(ids))
-            .yield_per(1)
-            .enable_eagerloads(False)
-        )
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start : start + chunk_size]
+            blobs = {
+                blob.id: blob
+                for blob in self._session.query(ErtBlob)
+                .filter(ErtBlob.id.in_(set(chunk)))
+                .enable_eagerloads(False)
+            }
+            for id in chunk:
+                if id in blobs:
+                    yield blobs[id]
@@ -0,0 +1,229 @@
+"""Typed binary encoding for the values stored in `ert_blob`.
+
+A payload consists of a fixed-size header followed by the raw little-endian
+bytes of a NumPy array::
+
+    magic   4s   b"ERTB"
+    version B
+    flags   B    FLAG_COMPRESSED | FLAG_PICKLED
+    dtlen   B    length of the dtype string
+    ndim    B
+    dtype   dtlen bytes, ascii, NumPy array-protocol typestr (e.g. "<f8")
+    shape   ndim x uint64 (little-endian)
+    <padding up to a multiple of 8 bytes>
+    data
+
+Uncompressed payloads are decoded with `np.frombuffer`, so the returned array
+shares memory with the payload and is read-only.
+
+"""
+import datetime
+import hashlib
+import io
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"ERTB"
+VERSION = 1
+
+FLAG_COMPRESSED = 0x1
+FLAG_PICKLED = 0x2
+
+_HEADER = struct.Struct("<4sBBBB")
+_ALIGNMENT = 8
+
+_DATE_TYPES = (datetime.date, np.datetime64)
+
+
+def _to_array(data):
+    """Return `data` as a little-endian array, or None if the array would not
+    decode back to `data`, e.g. for ragged lists or lists that mix types or
+    contain None"""
+    if isinstance(data, np.ndarray) and data.dtype.kind != "O":
+        array = data
+    else:
+        try:
+            objects = np.array(data, dtype=object)
+        except ValueError:
+            return None
+        types = {type(value) for value in objects.flat}
+        if types and all(issubclass(type_, _DATE_TYPES) for type_ in types):
+            # Lists of pandas Timestamps or datetimes
+            array = objects.astype("datetime64[us]")
+        elif len(types) > 1:
+            return None
+        else:
+            try:
+                array = np.asarray(data)
+            except ValueError:
+                return None
+            if array.dtype.kind == "O":
+                return None
+    if array.dtype.kind == "M":
+        array = array.astype("datetime64[us]")
+    return array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+
+def encode(data, compress=False):
+    """Encode `data` (a scalar, a list or a NumPy array) as a blob payload.
+
+    Values that do not map onto a fixed-width NumPy dtype (e.g. lists of
+    mixed objects) are pickled and flagged as such in the header.
+
+    """
+    flags = 0
+    array = _to_array(data)
+    if array is None:
+        flags |= FLAG_PICKLED
+        body = pickle.dumps(data)
+        dtype = "|O"
+        shape = ()
+    else:
+        body = array.tobytes(order="C")
+        dtype = array.dtype.str
+        shape = array.shape
+
+    if compress:
+        flags |= FLAG_COMPRESSED
+        body = zlib.compress(body)
+
+    dtype = dtype.encode("ascii")
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(dtype), len(shape))
+    header += dtype + struct.pack("<{}Q".format(len(shape)), *shape)
+    header += b"\0" * (-len(header) % _ALIGNMENT)
+    return header + body
+
+
+def _read_header(payload):
+    magic, version, flags, dtlen, ndim = _HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not an ERT blob payload")
+    if version > VERSION:
+        raise ValueError("Unsupported ERT blob version {}".format(version))
+
+    offset = _HEADER.size
+    dtype = bytes(payload[offset : offset + dtlen]).decode("ascii")
+    offset += dtlen
+    shape = struct.unpack_from("<{}Q".format(ndim), payload, offset)
+    offset += 8 * ndim
+    offset += -offset % _ALIGNMENT
+    return flags, dtype, shape, offset
+
+
+def decode(payload):
+    """Decode a blob payload into a NumPy array.
+
+    Uncompressed numeric payloads are returned without copying. Pickled
+    payloads return whatever object was originally stored.
+
+    """
+    flags, dtype, shape, offset = _read_header(payload)
+    body = memoryview(payload)[offset:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    if flags & FLAG_PICKLED:
+        return pickle.loads(body)
+    return np.frombuffer(body, dtype=np.dtype(dtype)).reshape(shape)
+
+
+def to_python(array):
+    """Convert a decoded array into the plain Python value that was stored"""
+    if isinstance(array, np.ndarray):
+        return array.tolist()
+    return array
+
+
+def digest(payload):
+    """Content hash of an encoded payload, used to share identical blobs"""
+    return hashlib.sha256(payload).hexdigest()
+
+
+# Matrices of realizations x data points are sent over HTTP in NumPy's
+# `.npy` format, so clients can load them without parsing text.
+MATRIX_MIMETYPE = "application/x-npy"
+
+# An indexed matrix is two consecutive `.npy` arrays: the realization index
+# of every row, followed by the matrix itself
+INDEXED_MATRIX_MIMETYPE = "application/x-ert-indexed-npy"
+
+
+def stack(arrays):
+    """Stack decoded blobs into a matrix with one row per blob. Scalars become
+    rows of length one."""
+    arrays = [np.atleast_1d(array) for array in arrays]
+    if len(arrays) == 0:
+        return np.empty((0, 0))
+    return np.stack(arrays)
+
+
+def encode_matrix(matrix):
+    buf = io.BytesIO()
+    np.save(buf, matrix, allow_pickle=False)
+    return buf.getvalue()
+
+
+def stream_matrix(rows, num_rows):
+    """Encode `num_rows` rows of equal length as a matrix like `encode_matrix`,
+    yielding the header followed by one chunk per row so that the matrix is
+    never held in memory.
+
+    The dtype of the first row is used for the whole matrix, so the other rows
+    must be safely castable to it.
+
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        if num_rows != 0:
+            raise ValueError("Expected {} rows, got 0".format(num_rows))
+        yield encode_matrix(np.empty((0, 0)))
+        return
+
+    first = np.atleast_1d(first)
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        header,
+        {
+            "descr": np.lib.format.dtype_to_descr(first.dtype),
+            "fortran_order": False,
+            "shape": (num_rows,) + first.shape,
+        },
+    )
+    yield header.getvalue()
+    yield np.ascontiguousarray(first).tobytes()
+
+    count = 1
+    for row in rows:
+        row = np.atleast_1d(row)
+        if row.shape != first.shape or not np.can_cast(row.dtype, first.dtype):
+            raise ValueError(
+                "Row of {} {} does not fit a matrix of {} {}".format(
+                    row.dtype, row.shape, first.dtype, first.shape
+                )
+            )
+        yield np.ascontiguousarray(row, dtype=first.dtype).tobytes()
+        count += 1
+    if count != num_rows:
+        raise ValueError("Expected {} rows, got {}".format(num_rows, count))
+
+
+def decode_matrix(payload):
+    return np.load(io.BytesIO(payload), allow_pickle=False)
+
+
+def stream_indexed_matrix(indexes, rows):
+    """Encode the realization `indexes` followed by the matrix of `rows`, one
+    row per index, streaming the rows like `stream_matrix`"""
+    yield encode_matrix(np.asarray(indexes, dtype=np.int64))
+    yield from stream_matrix(rows, len(indexes))
+
+
+def decode_indexed_matrix(payload):
+    """Return the realization indexes and the matrix of an indexed matrix"""
+    buf = io.BytesIO(payload)
+    indexes = np.load(buf, allow_pickle=False)
+    matrix = np.load(buf, allow_pickle=False)
+    return indexes, matrix
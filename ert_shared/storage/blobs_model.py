@@ -1,16 +1,17 @@
+from ert_shared.storage import blob_encoding
 from sqlalchemy import (
     Column,
     DateTime,
     Float,
     ForeignKey,
     Integer,
-    PickleType,
+    LargeBinary,
     String,
     Table,
 )
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import backref, relationship
+from sqlalchemy.orm import backref, relationship, validates
 from sqlalchemy.orm.collections import attribute_mapped_collection
 from sqlalchemy.schema import UniqueConstraint, MetaData
 from sqlalchemy.sql import func
@@ -32,7 +33,31 @@ class ErtBlob(Blobs):
     __tablename__ = "ert_blob"
 
     id = Column(Integer, primary_key=True)
-    data = Column(PickleType)
+    payload = Column("data", LargeBinary)
+    # Identical payloads are stored once and shared between all references.
+    # The blob is deleted when the last reference is released.
+    digest = Column(String(64), index=True)
+    ref_count = Column(Integer, nullable=False, default=1, server_default="1")
+
+    @validates("payload")
+    def _update_digest(self, key, payload):
+        self.digest = None if payload is None else blob_encoding.digest(payload)
+        return payload
+
+    @property
+    def array(self):
+        """The stored value as a read-only NumPy array, sharing memory with the
+        payload"""
+        return blob_encoding.decode(self.payload)
+
+    @property
+    def data(self):
+        """The stored value as a plain Python scalar or list"""
+        return blob_encoding.to_python(self.array)
+
+    @data.setter
+    def data(self, value):
+        self.payload = blob_encoding.encode(value)
 
     def __repr__(self):
         return "<Value(id='{}', data='{}')>".format(self.id, self.data)
@@ -1,20 +1,62 @@
+import os
 import pandas as pd
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from ert_shared.feature_toggling import feature_enabled
+from ert_shared.storage import blob_encoding, connection
 from ert_shared.storage.server_monitor import ServerMonitor
+from ert_shared.storage.storage_api import DEFAULT_QUANTILES
 
 
 def convertdate(dstring):
     return datetime.strptime(dstring, "%Y-%m-%d %H:%M:%S")
 
 
+def _parse_axis(text):
+    indexes = text.split(",")
+    try:
+        if indexes and ":" in indexes[0]:
+            return list(map(convertdate, indexes))
+        else:
+            return list(map(int, indexes))
+    except ValueError as e:
+        raise ValueError("Could not parse indexes as either int or dates", e)
+
+
+def _parse_data(text):
+    return list(map(float, text.split(",")))
+
+
 class StorageClient:
-    def __init__(self, base_url, auth):
+    # Maximum number of URLs sent in one request to the batch endpoint
+    BATCH_SIZE = 500
+    MAX_CONCURRENT_REQUESTS = 8
+    POOL_SIZE = MAX_CONCURRENT_REQUESTS
+
+    def __init__(self, base_url, auth, unix_socket=None):
         self._BASE_URI = base_url
         self._auth = auth
 
+        # A single session keeps the connections to the server alive between
+        # requests
+        self._session = requests.Session()
+        self._session.auth = auth
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Requests to the server on this host skip TCP when it also listens on a
+        # Unix domain socket, and compression would only cost CPU time
+        if unix_socket is not None and os.path.exists(unix_socket):
+            self._session.mount(
+                f"{base_url}/",
+                connection.UnixSocketAdapter(unix_socket, pool_maxsize=self.POOL_SIZE),
+            )
+            self._session.headers["Accept-Encoding"] = "identity"
+
     def all_data_type_keys(self):
         """Returns a list of all the keys except observation keys. For each key a dict is returned with info about
             the key
@@ -47,9 +89,7 @@ class StorageClient:
             return []
         ens_schema = self._ref_request(ensembles["ensembles"][0]["ref_url"])
 
-        def obs_for_response(ref_url):
-            response = self._ref_request(ref_url)
-
+        def obs_for_response(response):
             if "observations" not in response:
                 return []
 
@@ -58,17 +98,21 @@ class StorageClient:
 
             return response["observations"]
 
+        # The summaries have the observations without computing the misfits
+        responses = self._batch_request(
+            ["{}/summary".format(resp["ref_url"]) for resp in ens_schema["responses"]]
+        )
         result = [
             {
                 "key": resp["name"],
                 "index_type": None,
-                "observations": obs_for_response(resp["ref_url"]),
+                "observations": obs_for_response(response),
                 "has_refcase": False,
                 "dimensionality": 2,
                 "metadata": {"data_origin": "Reponse"},
                 "log_scale": False,
             }
-            for resp in ens_schema["responses"]
+            for resp, response in zip(ens_schema["responses"], responses)
         ]
 
         result.extend(
@@ -102,9 +146,7 @@ class StorageClient:
         ]
         """
 
-        r = requests.get(
-            "{base}/ensembles".format(base=self._BASE_URI), auth=self._auth
-        )
+        r = self._session.get("{base}/ensembles".format(base=self._BASE_URI))
 
         print(r.content)
         ensembles = r.json()["ensembles"]
@@ -117,40 +159,110 @@ class StorageClient:
     def data_for_key(self, case, key):
         """Returns a pandas DataFrame with the datapoints for a given key for a given case. The row index is
         the realization number, and the column index is a multi-index with (key, index/date)"""
+        return self.data_for_cases([case], key)[case]
+
+    def data_for_cases(self, cases, key):
+        """Returns a dict from case name to the pandas DataFrame that
+        `data_for_key` would return for that case. The requests for the
+        different cases are done concurrently, with at most
+        MAX_CONCURRENT_REQUESTS requests in flight."""
 
         if key.startswith("LOG10_"):
             key = key[6:]
 
         ensembles = self._ref_request("{base}/ensembles".format(base=self._BASE_URI))
+        ens_urls = [
+            [ens for ens in ensembles["ensembles"] if ens["name"] == case][0]["ref_url"]
+            for case in cases
+        ]
 
-        ens = [ens for ens in ensembles["ensembles"] if ens["name"] == case][0]
-        ens_schema = self._ref_request(ens["ref_url"])
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS) as executor:
+            # Walk the ensemble -> response/parameter chain for all cases, then
+            # fetch all data and axes
+            data_urls = list(
+                executor.map(lambda url: self._data_urls(url, key), ens_urls)
+            )
+            matrices = [
+                executor.submit(self._read_matrix, urls[0]) if urls else None
+                for urls in data_urls
+            ]
+            axes = [
+                executor.submit(self._axis_request, urls[1])
+                if urls and urls[1]
+                else None
+                for urls in data_urls
+            ]
 
-        df = pd.DataFrame()
+            result = {}
+            for case, matrix, axis in zip(cases, matrices, axes):
+                df = matrix.result() if matrix is not None else pd.DataFrame()
+                # Responses without any realizations come back without columns
+                if axis is not None and len(df.columns) > 0:
+                    df.columns = axis.result()
+                result[case] = df
+        return result
 
-        # Response Key
-        for resp in ens_schema["responses"]:
-            if resp["name"] != key:
-                continue
+    def statistics_for_cases(self, cases, key, quantiles=DEFAULT_QUANTILES):
+        """Returns a dict from case name to a pandas DataFrame with statistics
+        of the response `key` over the realizations of the case. The row index
+        is the index/date, and the columns are Minimum, Maximum, Mean, Std and
+        one pNN column per quantile. The statistics are computed by the server,
+        so only the statistics are transferred, not every realization. Cases
+        without the response map to an empty DataFrame."""
+
+        ensembles = self._ref_request("{base}/ensembles".format(base=self._BASE_URI))
+        ens_urls = [
+            [ens for ens in ensembles["ensembles"] if ens["name"] == case][0]["ref_url"]
+            for case in cases
+        ]
+        query = "quantiles=" + ",".join(str(quantile) for quantile in quantiles)
+
+        def statistics(ens_url):
+            ens_schema = self._ref_request(ens_url + "?fields=responses")
+            for resp in ens_schema["responses"]:
+                if resp["name"] == key:
+                    stats = self._ref_request(resp["ref_url"] + "/statistics?" + query)
+                    break
+            else:
+                return pd.DataFrame()
+            if stats["realizations"] == 0:
+                return pd.DataFrame()
 
-            response = self._ref_request(resp["ref_url"])
+            df = pd.DataFrame(
+                {
+                    "Minimum": stats["min"],
+                    "Maximum": stats["max"],
+                    "Mean": stats["mean"],
+                    "Std": stats["std"],
+                },
+                dtype=float,
+            )
+            for quantile in stats["quantiles"]:
+                name = "p{:.0f}".format(quantile["quantile"] * 100)
+                df[name] = pd.Series(quantile["values"], dtype=float)
+            df.index = self._axis_request(stats["axis"]["data_url"])
+            return df
 
-            df = self._read_csv(response["alldata_url"], header=None)
-            indexes = self._axis_request(response["axis"]["data_url"])
-            df.columns = indexes
-            break
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS) as executor:
+            return dict(zip(cases, executor.map(statistics, ens_urls)))
 
-        # Parameter key - we only check if necessary
-        if df.empty:
-            for param in ens_schema["parameters"]:
-                if param["group"] + ":" + param["key"] != key:
-                    continue
+    def _data_urls(self, ens_url, key):
+        """Return the data url and the axis url (None for parameters) of the
+        response or parameter `key` in the ensemble at `ens_url`"""
+        ens_schema = self._ref_request(ens_url + "?fields=responses,parameters")
 
-                parameter = self._ref_request(param["ref_url"])
+        for resp in ens_schema["responses"]:
+            if resp["name"] == key:
+                # The summary doesn't compute the misfits
+                response = self._ref_request(resp["ref_url"] + "/summary")
+                return response["alldata_url"], response["axis"]["data_url"]
 
-                df = self._read_csv(parameter["alldata_url"], header=None)
+        for param in ens_schema["parameters"]:
+            if param["group"] + ":" + param["key"] == key:
+                parameter = self._ref_request(param["ref_url"])
+                return parameter["alldata_url"], None
 
-        return df
+        return None
 
     def observations_for_obs_keys(self, case, obs_keys):
         """Returns a pandas DataFrame with the datapoints for a given observation key for a given case. The row index
@@ -163,18 +275,25 @@ class StorageClient:
         if len(obs_keys) == 0:
             return df
 
-        for obs_key in obs_keys:
-            key_df = pd.DataFrame()
-            std = self._data_request(obs_key["data"]["std"]["data_url"])
-            values = self._data_request(obs_key["data"]["values"]["data_url"])
+        fields = ("std", "values", "key_indexes", "data_indexes")
+        bodies = self._batch_request(
+            [
+                obs_key["data"][field]["data_url"]
+                for obs_key in obs_keys
+                for field in fields
+            ]
+        )
 
-            key_df = key_df.append(pd.Series(values, name="OBS"))
-            key_df = key_df.append(pd.Series(std, name="STD"))
+        for i, obs_key in enumerate(obs_keys):
+            std, values, key_indexes, data_indexes = bodies[
+                i * len(fields) : (i + 1) * len(fields)
+            ]
+            key_df = pd.DataFrame()
+            key_df = key_df.append(pd.Series(_parse_data(values), name="OBS"))
+            key_df = key_df.append(pd.Series(_parse_data(std), name="STD"))
 
-            key_indexes = self._axis_request(obs_key["data"]["key_indexes"]["data_url"])
-            data_indexes = self._axis_request(
-                obs_key["data"]["data_indexes"]["data_url"]
-            )
+            key_indexes = _parse_axis(key_indexes)
+            data_indexes = _parse_axis(data_indexes)
 
             arrays = [[obs_key["name"]] * len(key_indexes), key_indexes, data_indexes]
 
@@ -200,33 +319,60 @@ class StorageClient:
         """A noop---the lifecycle of the server is managed by the user."""
         pass
 
-    def _read_csv(self, data_url, **kwargs):
-        resp = requests.get(data_url, auth=self._auth)
-        sio = StringIO(resp.text)
-        return pd.read_csv(sio, **kwargs)
+    def _read_matrix(self, data_url):
+        """Read a realization x index matrix with the realization numbers as
+        row index, preferring the binary formats over CSV. Older servers
+        without the indexed format give rows in realization order, numbered
+        from 0."""
+        resp = self._session.get(
+            data_url,
+            headers={
+                "Accept": f"{blob_encoding.INDEXED_MATRIX_MIMETYPE}, "
+                f"{blob_encoding.MATRIX_MIMETYPE};q=0.9, text/csv;q=0.5"
+            },
+        )
+        content_type = resp.headers.get("Content-Type")
+        if content_type == blob_encoding.INDEXED_MATRIX_MIMETYPE:
+            indexes, matrix = blob_encoding.decode_indexed_matrix(resp.content)
+            return pd.DataFrame(matrix, index=indexes)
+        if content_type == blob_encoding.MATRIX_MIMETYPE:
+            return pd.DataFrame(blob_encoding.decode_matrix(resp.content))
+        return pd.read_csv(StringIO(resp.text), header=None)
 
     def _axis_request(self, data_url):
-        resp = requests.get(data_url, auth=self._auth)
-        indexes = resp.content.decode(resp.encoding).split(",")
-        try:
-            if indexes and ":" in indexes[0]:
-                return list(map(convertdate, indexes))
-            else:
-                return list(map(int, indexes))
-        except ValueError as e:
-            raise ValueError("Could not parse indexes as either int or dates", e)
-
-    def _data_request(self, data_url):
-        resp = requests.get(data_url, auth=self._auth)
-        data = resp.content.decode(resp.encoding)
-        return list(map(float, data.split(",")))
+        resp = self._session.get(data_url)
+        return _parse_axis(resp.content.decode(resp.encoding))
 
     def _ref_request(self, data_url):
-        resp = requests.get(data_url, auth=self._auth)
+        resp = self._session.get(data_url)
         return resp.json()
 
+    def _batch_request(self, urls):
+        """GET all `urls` through the server's batch endpoint and return the
+        bodies in the same order"""
+        bodies = []
+        for start in range(0, len(urls), self.BATCH_SIZE):
+            chunk = urls[start : start + self.BATCH_SIZE]
+            resp = self._session.post(
+                "{base}/batch".format(base=self._BASE_URI), json={"urls": chunk}
+            )
+            resp.raise_for_status()
+            for url, response in zip(chunk, resp.json()["responses"]):
+                if response["status"] != 200:
+                    raise RuntimeError(
+                        "Request for {} failed with status {}".format(
+                            url, response["status"]
+                        )
+                    )
+                bodies.append(response["body"])
+        return bodies
+
 
 @feature_enabled("new-storage")
 def create_client():
     server = ServerMonitor.get_instance()
-    return StorageClient(server.fetch_url(), server.fetch_auth())
+    return StorageClient(
+        server.fetch_url(),
+        server.fetch_auth(),
+        unix_socket=server.fetch_connection_info().get("unix_socket"),
+    )
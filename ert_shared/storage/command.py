@@ -1,5 +1,7 @@
 import os
 
+from ert_shared.storage import ENGINE_PROFILES
+
 
 def add_parser_options(ap):
     ap.add_argument(
@@ -21,4 +23,53 @@ def add_parser_options(ap):
     ap.add_argument(
         "--rdb-url", type=str, default=f"sqlite:///{os.getcwd()}/entities.db"
     )
+    ap.add_argument(
+        "--engine-profile",
+        choices=sorted(ENGINE_PROFILES),
+        default="default",
+        help="SQLite tuning profile. 'wal' enables write-ahead logging, "
+        "memory-mapped I/O and a busy timeout so that the server can read while "
+        "the database is being written to. Requires a local file system.",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of server processes. Each process has its own database "
+        "connections and response cache.",
+    )
+    ap.add_argument(
+        "--worker-class",
+        choices=["sync", "gthread"],
+        default="sync",
+        help="'sync' serves one request at a time per process, 'gthread' serves "
+        "one request per thread.",
+    )
+    ap.add_argument(
+        "--threads",
+        type=int,
+        default=4,
+        help="Number of threads per process with the 'gthread' worker class.",
+    )
+    ap.add_argument(
+        "--timeout",
+        type=int,
+        default=120,
+        help="Seconds a request may take before its worker is restarted.",
+    )
+    ap.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=5,
+        help="Seconds to finish open requests when shutting down. 'gthread' "
+        "workers also wait for idle keep-alive connections, so keep this below "
+        "the 10 seconds ServerMonitor waits before killing the server.",
+    )
+    ap.add_argument(
+        "--unix-socket",
+        action="store_true",
+        default=False,
+        help="Also listen on a Unix domain socket in the user's runtime directory. "
+        "Clients on the same host use it instead of TCP.",
+    )
     ap.add_argument("--debug", action="store_true", default=False)
@@ -1,9 +1,20 @@
 import os
 import json
+import socket
 import requests
 import getpass
-from typing import Dict, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
+from urllib.parse import urlsplit
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+
+# Seconds to wait for a candidate URL to answer its healthcheck
+PROBE_TIMEOUT = 2
 
 
 def _json_path(project_path: Union[str, Path] = None) -> Path:
@@ -13,21 +24,37 @@ def _json_path(project_path: Union[str, Path] = None) -> Path:
     """
 
     if project_path is None:
-        if "XDG_RUNTIME_DIR" in os.environ:
-            project_path = Path(os.environ["XDG_RUNTIME_DIR"]) / "ert"
-            project_path.mkdir(exist_ok=True)
-        else:
-            project_path = Path(f"/tmp/ert-{getpass.getuser()}")
-            project_path.mkdir(mode=0o700, exist_ok=True)
+        project_path = _runtime_dir()
 
     project_path = Path(project_path)
     return project_path / "storage_server.json"
 
 
+def _runtime_dir() -> Path:
+    """Return this user's private directory for storage server files"""
+    if "XDG_RUNTIME_DIR" in os.environ:
+        path = Path(os.environ["XDG_RUNTIME_DIR"]) / "ert"
+        path.mkdir(exist_ok=True)
+    else:
+        path = Path(f"/tmp/ert-{getpass.getuser()}")
+        path.mkdir(mode=0o700, exist_ok=True)
+    return path
+
+
+def socket_path() -> Path:
+    """Return the path of the Unix domain socket for a storage server started by
+    this process. It is kept in the runtime directory rather than the runpath,
+    since socket paths are limited to around 100 characters.
+
+    """
+    return _runtime_dir() / f"storage_server-{os.getpid()}.sock"
+
+
 def get_info(project_path: Union[str, Path] = None) -> Dict[str, str]:
     """Return a dictionary containing `auth`, a tuple of (username, password) and
-    `baseurl`, the URL that the server responds to. If `project_path` is None,
-    look for any storage_server running on the machine.
+    `baseurl`, the URL that the server responds to. If the server listens on a
+    Unix domain socket, its path is given as `unix_socket`. If `project_path` is
+    None, look for any storage_server running on the machine.
 
     """
 
@@ -36,20 +63,47 @@ def get_info(project_path: Union[str, Path] = None) -> Dict[str, str]:
         raise RuntimeError(f"{path} is not a file")
 
     with path.open() as f:
-        info = json.load(f)
+        info_file = json.load(f)
 
-    auth = ("__token__", info["authtoken"])
-    for baseurl in info["urls"]:
-        try:
-            resp = requests.get(f"{baseurl}/healthcheck", auth=auth)
-            if resp.status_code == 200:
-                break
-        except requests.ConnectionError:
-            pass
-    else:
+    auth = ("__token__", info_file["authtoken"])
+    baseurl = find_url(info_file["urls"], auth)
+    if baseurl is None:
         raise RuntimeError(f"None of the URLs provided by {path} are valid")
 
-    return {"baseurl": baseurl, "auth": auth}
+    info = {"baseurl": baseurl, "auth": auth}
+    if "unix_socket" in info_file:
+        info["unix_socket"] = info_file["unix_socket"]
+    return info
+
+
+def find_url(
+    urls: List[str], auth: Tuple[str, str], timeout: float = PROBE_TIMEOUT
+) -> Optional[str]:
+    """Return the first of `urls` that answers the healthcheck, or None if none
+    of them do. The URLs are probed concurrently, so a host name that doesn't
+    respond only costs time when none of the URLs before it work.
+
+    """
+    if not urls:
+        return None
+
+    def probe(url):
+        try:
+            resp = requests.get(f"{url}/healthcheck", auth=auth, timeout=timeout)
+            return resp.status_code == 200
+        except requests.RequestException:
+            return False
+
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        futures = [executor.submit(probe, url) for url in urls]
+        for url, future in zip(urls, futures):
+            if future.result():
+                return url
+        return None
+    finally:
+        # Don't wait for the probes of the URLs that are not needed
+        executor.shutdown(wait=False)
 
 
 def set_global_info(project_path: Union[str, Path]):
@@ -58,3 +112,62 @@ def set_global_info(project_path: Union[str, Path]):
     if path.is_symlink():
         path.unlink()
     path.symlink_to(_json_path(project_path))
+
+
+class _UnixSocketConnection(HTTPConnection):
+    def __init__(self, *args, socket_path, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixSocketConnection
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Send HTTP requests through a Unix domain socket. Mount it on the base URL
+    of a server that also listens on `socket_path`, so that the URLs, and the
+    Host header that the server builds its links from, stay the same as for TCP.
+
+    """
+
+    def __init__(self, socket_path, pool_maxsize=DEFAULT_POOLSIZE):
+        self._socket_path = str(socket_path)
+        self._pool_maxsize = pool_maxsize
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        super().__init__(pool_maxsize=pool_maxsize)
+
+    def get_connection(self, url, proxies=None):
+        parts = urlsplit(url)
+        key = (parts.hostname, parts.port)
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = _UnixSocketConnectionPool(
+                    parts.hostname,
+                    parts.port,
+                    maxsize=self._pool_maxsize,
+                    socket_path=self._socket_path,
+                )
+            return self._pools[key]
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.get_connection(request.url, proxies)
+
+    def close(self):
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+        super().close()
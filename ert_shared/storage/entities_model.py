@@ -3,6 +3,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     PickleType,
     String,
@@ -66,7 +67,9 @@ class Update(Entities):
 
     id = Column(Integer, primary_key=True)
     algorithm = Column(String, nullable=False)
-    ensemble_reference_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False)
+    ensemble_reference_id = Column(
+        Integer, ForeignKey("ensemble.id"), nullable=False, index=True
+    )
     ensemble_reference = relationship(
         "Ensemble",
         foreign_keys=[ensemble_reference_id],
@@ -111,7 +114,7 @@ class Realization(Entities):
 
     id = Column(Integer, primary_key=True)
     index = Column(Integer, nullable=False)
-    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False)
+    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False, index=True)
     ensemble = relationship("Ensemble", back_populates="realizations")
 
     __table_args__ = (
@@ -135,7 +138,7 @@ class ResponseDefinition(Entities):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     indexes_ref = Column(Integer)  # Reference to the description of  plot axis
-    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False)
+    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False, index=True)
     ensemble = relationship("Ensemble", back_populates="response_definitions")
 
     __table_args__ = (
@@ -165,7 +168,7 @@ class Response(Entities):
     realization_id = Column(Integer, ForeignKey("realization.id"), nullable=False)
     realization = relationship("Realization", back_populates="responses")
     response_definition_id = Column(
-        Integer, ForeignKey("response_definition.id"), nullable=False
+        Integer, ForeignKey("response_definition.id"), nullable=False, index=True
     )
     response_definition = relationship("ResponseDefinition", back_populates="responses")
 
@@ -196,7 +199,7 @@ prior_ensemble_association_table = Table(
     "prior_ensemble_association_table",
     Entities.metadata,
     Column("prior_id", String, ForeignKey("parameter_prior.id")),
-    Column("ensemble_id", Integer, ForeignKey("ensemble.id")),
+    Column("ensemble_id", Integer, ForeignKey("ensemble.id"), index=True),
 )
 
 
@@ -210,6 +213,8 @@ class ParameterPrior(Entities):
     parameter_names = Column("parameter_names", PickleType)
     parameter_values = Column("parameter_values", PickleType)
 
+    __table_args__ = (Index("ix_parameter_prior_group_key", "group", "key"),)
+
     ensemble = relationship(
         "Ensemble", secondary=lambda: prior_ensemble_association_table, backref="priors"
     )
@@ -221,7 +226,7 @@ class ParameterDefinition(Entities):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     group = Column(String, nullable=False)
-    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False)
+    ensemble_id = Column(Integer, ForeignKey("ensemble.id"), nullable=False, index=True)
     ensemble = relationship("Ensemble", back_populates="parameter_definitions")
     prior_id = Column(Integer, ForeignKey("parameter_prior.id"))
     prior = relationship("ParameterPrior")
@@ -254,7 +259,7 @@ class Parameter(Entities):
     realization_id = Column(Integer, ForeignKey("realization.id"), nullable=False)
     realization = relationship("Realization", back_populates="parameters")
     parameter_definition_id = Column(
-        Integer, ForeignKey("parameter_definition.id"), nullable=False
+        Integer, ForeignKey("parameter_definition.id"), nullable=False, index=True
     )
     parameter_definition = relationship(
         "ParameterDefinition", back_populates="parameters"
@@ -361,7 +366,7 @@ class ObservationResponseDefinitionLink(Entities):
     response_definition = relationship(
         "ResponseDefinition", back_populates="observation_links"
     )
-    observation_id = Column(Integer, ForeignKey("observation.id"))
+    observation_id = Column(Integer, ForeignKey("observation.id"), index=True)
     observation = relationship(
         "Observation", back_populates="response_definition_links"
     )
@@ -400,7 +405,7 @@ class Misfit(Entities):
     response_id = Column(Integer, ForeignKey("response.id"), nullable=False)
     response = relationship("Response", back_populates="misfits")
     observation_response_definition_link_id = Column(
-        Integer, ForeignKey("observation_response_definition_link.id")
+        Integer, ForeignKey("observation_response_definition_link.id"), index=True
     )
     observation_response_definition_link = relationship(
         "ObservationResponseDefinitionLink", back_populates="misfits"
@@ -1,3 +1,5 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from logging import exception
 import time
 
@@ -9,40 +11,61 @@ from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.entities_model import ParameterPrior
 from ert_shared.storage.rdb_api import RdbApi
 
+from res.enkf.enums import RealizationStateEnum
 from res.enkf.export import MisfitCollector
 import logging
 
 logger = logging.getLogger(__file__)
 
 
-def _create_ensemble(rdb_api, reference, priors):
+ExtractionSnapshot = namedtuple(
+    "ExtractionSnapshot",
+    [
+        "ensemble_name",
+        "ensemble_size",
+        "reference",
+        "priors",
+        "observations",
+        "parameters",
+        "responses",
+        "update_data",
+    ],
+)
+
+
+def _create_ensemble(rdb_api, ensemble_name, ensemble_size, reference, priors):
     if not ((reference is None) ^ (len(priors) == 0)):
         raise ValueError("Ensembles can have only a reference or a set of priors")
-    facade = ERT.enkf_facade
-    ensemble_name = facade.get_current_case_name()
     ensemble = rdb_api.add_ensemble(ensemble_name, reference=reference, priors=priors)
 
-    for i in range(facade.get_ensemble_size()):
+    for i in range(ensemble_size):
         rdb_api.add_realization(index=i, ensemble_name=ensemble.name)
 
     return ensemble
 
 
-def _extract_and_dump_observations(rdb_api, blob_api):
-    facade = ERT.enkf_facade
+def _realizations_with_data(facade):
+    state_map = facade.get_current_fs().getStateMap()
+    mask = state_map.createMask(RealizationStateEnum.STATE_HAS_DATA)
+    return {index for index, has_data in enumerate(mask) if has_data}
+
+
+def _is_stored(stored, key, realizations):
+    """Whether all of `realizations` are already stored for `key`"""
+    return stored is not None and key in stored and realizations <= stored[key]
+
 
+def _extract_observations(facade):
     observation_keys = [
         facade.get_observation_key(nr) for nr, _ in enumerate(facade.get_observations())
     ]
 
     if len(observation_keys) == 0:
-        return
+        return None
     measured_data = MeasuredData(facade, observation_keys)
 
     measured_data.remove_inactive_observations()
-    observations = measured_data.data.loc[["OBS", "STD"]]
-
-    _dump_observations(rdb_api=rdb_api, blob_api=blob_api, observations=observations)
+    return measured_data.data.loc[["OBS", "STD"]]
 
 
 def _dump_observations(rdb_api, blob_api, observations):
@@ -68,93 +91,96 @@ def _dump_observations(rdb_api, blob_api, observations):
         )
 
 
-def _extract_and_dump_parameters(rdb_api, blob_api, ensemble_name, priors):
-    facade = ERT.enkf_facade
-
+def _extract_parameters(facade, ensemble_name, stored=None, realizations=None):
     parameter_keys = [
-        key for key in facade.all_data_type_keys() if facade.is_gen_kw_key(key)
+        key
+        for key in facade.all_data_type_keys()
+        if facade.is_gen_kw_key(key)
+        and not _is_stored(stored, tuple(key.split(":")), realizations)
     ]
-    all_parameters = {
+    return {
         key: facade.gather_gen_kw_data(ensemble_name, key) for key in parameter_keys
     }
 
-    _dump_parameters(
-        rdb_api=rdb_api,
-        blob_api=blob_api,
-        parameters=all_parameters,
-        ensemble_name=ensemble_name,
-        priors=priors,
-    )
-
 
-def _dump_parameters(rdb_api, blob_api, parameters, ensemble_name, priors):
+def _dump_parameters(rdb_api, blob_api, parameters, ensemble_name, priors, stored=None):
+    """Dump GEN_KW parameters. `stored` maps (group, name) to the realization
+    indexes that already have a value in the ensemble; those are skipped and
+    the existing parameter definition is reused."""
     for key, parameter in parameters.items():
         group, name = key.split(":")
-        prior = next((x for x in priors if x.key == name and x.group == group), None)
-        parameter_definition = rdb_api.add_parameter_definition(
-            name=name, group=group, ensemble_name=ensemble_name, prior=prior
-        )
-        for realization_index, value in parameter.iterrows():
-            value_df = blob_api.add_blob(float(value))
-
-            rdb_api.add_parameter(
-                name=parameter_definition.name,
-                group=parameter_definition.group,
-                value_ref=value_df.id,
-                realization_index=realization_index,
-                ensemble_name=ensemble_name,
+        if stored is not None and (group, name) in stored:
+            parameter = parameter.drop(
+                index=list(stored[(group, name)]), errors="ignore"
             )
+            if parameter.empty:
+                continue
+        else:
+            prior = next(
+                (x for x in priors if x.key == name and x.group == group), None
+            )
+            rdb_api.add_parameter_definition(
+                name=name, group=group, ensemble_name=ensemble_name, prior=prior
+            )
+        values = parameter.iloc[:, 0]
+        value_ids = blob_api.add_blobs(float(value) for value in values)
+        rdb_api.add_parameters_bulk(
+            name=name,
+            group=group,
+            value_refs=dict(zip(values.index, value_ids)),
+            ensemble_name=ensemble_name,
+        )
 
 
-def _extract_and_dump_responses(rdb_api, blob_api, ensemble_name):
-    facade = ERT.enkf_facade
-
+def _extract_responses(facade, ensemble_name, stored=None, realizations=None):
     gen_data_keys = [
-        key for key in facade.all_data_type_keys() if facade.is_gen_data_key(key)
+        key
+        for key in facade.all_data_type_keys()
+        if facade.is_gen_data_key(key)
+        and not _is_stored(stored, key.split("@")[0], realizations)
     ]
     summary_data_keys = [
-        key for key in facade.all_data_type_keys() if facade.is_summary_key(key)
+        key
+        for key in facade.all_data_type_keys()
+        if facade.is_summary_key(key) and not _is_stored(stored, key, realizations)
     ]
 
-    gen_data_data = {
+    responses = {
         key.split("@")[0]: facade.gather_gen_data_data(case=ensemble_name, key=key)
         for key in gen_data_keys
     }
-    summary_data = {
-        key: facade.gather_summary_data(case=ensemble_name, key=key)
-        for key in summary_data_keys
-    }
-
-    _dump_response(
-        rdb_api=rdb_api,
-        blob_api=blob_api,
-        responses=gen_data_data,
-        ensemble_name=ensemble_name,
-    )
-    _dump_response(
-        rdb_api=rdb_api,
-        blob_api=blob_api,
-        responses=summary_data,
-        ensemble_name=ensemble_name,
-    )
+    if summary_data_keys:
+        # All summary keys are read in one pass over the summary files
+        responses.update(
+            facade.gather_all_summary_data(case=ensemble_name, keys=summary_data_keys)
+        )
+    return responses
 
 
-def _dump_response(rdb_api, blob_api, responses, ensemble_name):
+def _dump_response(rdb_api, blob_api, responses, ensemble_name, stored=None):
+    """Dump responses. `stored` maps response names to the realization indexes
+    that already have a response in the ensemble; those are skipped and the
+    existing response definition is reused."""
     for key, response in responses.items():
-        indexes_df = blob_api.add_blob(response.index.to_list())
-        response_definition = rdb_api.add_response_definition(
+        if stored is not None and key in stored:
+            response = response.drop(columns=list(stored[key]), errors="ignore")
+            if response.empty:
+                continue
+        else:
+            indexes_df = blob_api.add_blob(response.index.to_list())
+            rdb_api.add_response_definition(
+                name=key,
+                indexes_ref=indexes_df.id,
+                ensemble_name=ensemble_name,
+            )
+        values_ids = blob_api.add_blobs(
+            values.to_numpy() for _, values in response.items()
+        )
+        rdb_api.add_responses_bulk(
             name=key,
-            indexes_ref=indexes_df.id,
+            values_refs=dict(zip(response.columns, values_ids)),
             ensemble_name=ensemble_name,
         )
-        for realization_index, values in response.iteritems():
-            values_df = blob_api.add_blob(values.to_list())
-            rdb_api.add_response(
-                name=response_definition.name,
-                values_ref=values_df.id,
-                realization_index=realization_index,
-                ensemble_name=ensemble_name,
-            )
 
 
 def _extract_active_observations(facade):
@@ -174,91 +200,165 @@ def _extract_active_observations(facade):
     return active_observations
 
 
-def _extract_and_dump_update_data(ensemble_id, ensemble_name, rdb_api, blob_api):
-    facade = ERT.enkf_facade
-
+def _extract_update_data(facade, stored=None):
+    """Return the active observations and the misfit of each realization for
+    every observation. Misfits for the responses in `stored` are skipped."""
     fs = facade.get_current_fs()
     realizations = MisfitCollector.createActiveList(ERT.ert, fs)
 
     active_observations = _extract_active_observations(facade)
-    ensemble = rdb_api.get_ensemble_by_id(ensemble_id=ensemble_id)
-    update_id = ensemble.parent.id if ensemble.parent is not None else None
 
+    update_data = []
     for obs_vector in facade.get_observations():
         observation_key = obs_vector.getObservationKey()
         response_key = obs_vector.getDataKey()
-        response_definition = rdb_api._get_response_definition(
-            response_key, ensemble_id
+        stored_realizations = stored.get(response_key, set()) if stored else set()
+        update_data.append(
+            {
+                "observation_key": observation_key,
+                "response_key": response_key,
+                "active": None
+                if active_observations is None
+                else active_observations[observation_key],
+                "misfits": {
+                    realization_number: obs_vector.getTotalChi2(fs, realization_number)
+                    for realization_number in realizations
+                    if realization_number not in stored_realizations
+                },
+            }
         )
+    return update_data
+
 
-        if active_observations is not None:
-            active_blob = blob_api.add_blob(active_observations[observation_key])
+def _dump_update_data(rdb_api, blob_api, ensemble, update_data, stored=None):
+    update_id = ensemble.parent.id if ensemble.parent is not None else None
+    all_response_ids = rdb_api.get_response_ids(ensemble.id)
 
-        observation = rdb_api.get_observation(observation_key)
-        link = rdb_api._add_observation_response_definition_link(
-            observation_id=observation.id,
-            response_definition_id=response_definition.id,
-            active_ref=active_blob.id if active_observations is not None else None,
-            update_id=update_id,
+    for obs_update in update_data:
+        response_definition = rdb_api._get_response_definition(
+            obs_update["response_key"], ensemble.id
         )
-        for realization_number in realizations:
-            response = rdb_api.get_response(
-                name=response_key,
-                realization_index=realization_number,
-                ensemble_name=ensemble_name,
+        observation = rdb_api.get_observation(obs_update["observation_key"])
+        link = None
+        if stored is not None:
+            link = rdb_api._get_observation_response_definition_link(
+                observation_id=observation.id,
+                response_definition_id=response_definition.id,
+                update_id=update_id,
             )
-            misfit_value = obs_vector.getTotalChi2(fs, realization_number)
-            rdb_api._add_misfit(
-                value=misfit_value, link_id=link.id, response_id=response.id
+        if link is None:
+            active = obs_update["active"]
+            link = rdb_api._add_observation_response_definition_link(
+                observation_id=observation.id,
+                response_definition_id=response_definition.id,
+                active_ref=None if active is None else blob_api.add_blob(active).id,
+                update_id=update_id,
             )
 
+        response_ids = all_response_ids.get(obs_update["response_key"], {})
+        rdb_api._add_misfits_bulk(
+            link_id=link.id,
+            values={
+                response_ids[realization_number]: misfit_value
+                for realization_number, misfit_value in obs_update["misfits"].items()
+            },
+        )
 
-@feature_enabled("new-storage")
-def dump_to_new_storage(reference=None, rdb_session=None, blob_session=None):
 
-    start_time = time.time()
-    logger.debug("Starting extraction...")
+def _extract(
+    facade,
+    reference=None,
+    stored_parameters=None,
+    stored_responses=None,
+    realizations=None,
+):
+    """Read everything that is dumped for the current case from libres. The
+    `stored_*` arguments are given when appending to an existing ensemble."""
+    ensemble_name = facade.get_current_case_name()
+    appending = stored_parameters is not None
+    return ExtractionSnapshot(
+        ensemble_name=ensemble_name,
+        ensemble_size=facade.get_ensemble_size(),
+        reference=reference,
+        priors=facade.gen_kw_priors() if reference is None and not appending else {},
+        observations=_extract_observations(facade),
+        parameters=_extract_parameters(
+            facade, ensemble_name, stored=stored_parameters, realizations=realizations
+        ),
+        responses=_extract_responses(
+            facade, ensemble_name, stored=stored_responses, realizations=realizations
+        ),
+        update_data=_extract_update_data(facade, stored=stored_responses),
+    )
+
 
+def _dump(
+    rdb_api,
+    blob_api,
+    snapshot,
+    ensemble=None,
+    stored_parameters=None,
+    stored_responses=None,
+):
+    """Write a snapshot to storage, as a new ensemble or appended to
+    `ensemble`"""
+    if ensemble is None:
+        priors = _dump_priors(groups=snapshot.priors, rdb_api=rdb_api)
+        ensemble = _create_ensemble(
+            rdb_api,
+            ensemble_name=snapshot.ensemble_name,
+            ensemble_size=snapshot.ensemble_size,
+            reference=snapshot.reference,
+            priors=priors,
+        )
+    else:
+        logger.debug("Appending to ensemble {}".format(ensemble.name))
+        priors = ensemble.priors
+
+    if snapshot.observations is not None:
+        _dump_observations(
+            rdb_api=rdb_api, blob_api=blob_api, observations=snapshot.observations
+        )
+    _dump_parameters(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        parameters=snapshot.parameters,
+        ensemble_name=ensemble.name,
+        priors=priors,
+        stored=stored_parameters,
+    )
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses=snapshot.responses,
+        ensemble_name=ensemble.name,
+        stored=stored_responses,
+    )
+    _dump_update_data(
+        rdb_api, blob_api, ensemble, snapshot.update_data, stored=stored_responses
+    )
+    return ensemble
+
+
+def _session_apis(rdb_session=None, blob_session=None):
     if rdb_session is None:
         rdb_session = ERT_STORAGE.RdbSession()
 
     if blob_session is None:
         blob_session = ERT_STORAGE.BlobSession()
 
-    rdb_api = RdbApi(session=rdb_session)
-    blob_api = BlobApi(session=blob_session)
-
-    try:
-        priors = _extract_and_dump_priors(rdb_api=rdb_api) if reference is None else []
+    return RdbApi(session=rdb_session), BlobApi(session=blob_session)
 
-        ensemble = _create_ensemble(rdb_api, reference=reference, priors=priors)
-        _extract_and_dump_observations(rdb_api=rdb_api, blob_api=blob_api)
-
-        _extract_and_dump_parameters(
-            rdb_api=rdb_api,
-            blob_api=blob_api,
-            ensemble_name=ensemble.name,
-            priors=priors,
-        )
-        _extract_and_dump_responses(
-            rdb_api=rdb_api, blob_api=blob_api, ensemble_name=ensemble.name
-        )
-        _extract_and_dump_update_data(ensemble.id, ensemble.name, rdb_api, blob_api)
 
+def _commit(rdb_api, blob_api, write):
+    """Run `write` and commit both sessions, or roll back if it fails"""
+    rdb_session = rdb_api._session
+    blob_session = blob_api._session
+    try:
+        result = write()
         rdb_session.commit()
         blob_session.commit()
-        ensemble_name = ensemble.name
-
-        end_time = time.time()
-        logger.debug(
-            "Extraction done... (Took {:.2f} seconds)".format(end_time - start_time)
-        )
-        logger.debug(
-            "All ensembles in database: {}".format(
-                ", ".join([ensemble.name for ensemble in rdb_api.get_all_ensembles()])
-            )
-        )
-
+        return result
     except:
         rdb_session.rollback()
         blob_session.rollback()
@@ -267,13 +367,105 @@ def dump_to_new_storage(reference=None, rdb_session=None, blob_session=None):
         rdb_session.close()
         blob_session.close()
 
-    return ensemble_name
 
+@feature_enabled("new-storage")
+def dump_to_new_storage(
+    reference=None, rdb_session=None, blob_session=None, incremental=False
+):
+    """Extract the current case into storage and return the ensemble name.
+
+    With `incremental`, data is appended to the latest ensemble with the
+    current case name, if there is one. Only the realizations that have data
+    according to the state map but are missing from the ensemble are loaded
+    and written.
+
+    """
+
+    start_time = time.time()
+    logger.debug("Starting extraction...")
 
-def _extract_and_dump_priors(rdb_api):
     facade = ERT.enkf_facade
-    gen_kw_priors = facade.gen_kw_priors()
-    return _dump_priors(groups=gen_kw_priors, rdb_api=rdb_api)
+    rdb_api, blob_api = _session_apis(rdb_session, blob_session)
+
+    def write():
+        ensemble = None
+        if incremental:
+            ensemble = rdb_api.get_ensemble(facade.get_current_case_name())
+
+        if ensemble is None:
+            snapshot = _extract(facade, reference=reference)
+            return _dump(rdb_api, blob_api, snapshot).name
+
+        stored_parameters = rdb_api.get_parameter_realization_indexes(ensemble.id)
+        stored_responses = rdb_api.get_response_realization_indexes(ensemble.id)
+        snapshot = _extract(
+            facade,
+            stored_parameters=stored_parameters,
+            stored_responses=stored_responses,
+            realizations=_realizations_with_data(facade),
+        )
+        return _dump(
+            rdb_api,
+            blob_api,
+            snapshot,
+            ensemble=ensemble,
+            stored_parameters=stored_parameters,
+            stored_responses=stored_responses,
+        ).name
+
+    ensemble_name = _commit(rdb_api, blob_api, write)
+
+    end_time = time.time()
+    logger.debug(
+        "Extraction done... (Took {:.2f} seconds)".format(end_time - start_time)
+    )
+    return ensemble_name
+
+
+class ExtractionWorker:
+    """Dumps the current case to storage in a background thread.
+
+    `submit` reads the data from libres in the calling thread, so that the run
+    model can move on to the next case, and leaves writing it to a worker
+    thread with its own database sessions. Snapshots are written in the order
+    they were submitted, so an ensemble can refer to the one submitted before
+    it.
+
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    @feature_enabled("new-storage")
+    def submit(self, reference=None):
+        """Snapshot the current case and queue it for writing. Returns the
+        name the ensemble will be stored under."""
+        snapshot = _extract(ERT.enkf_facade, reference=reference)
+        self._futures.append(self._executor.submit(self._write, snapshot))
+        return snapshot.ensemble_name
+
+    @staticmethod
+    def _write(snapshot):
+        start_time = time.time()
+        rdb_api, blob_api = _session_apis()
+        _commit(rdb_api, blob_api, lambda: _dump(rdb_api, blob_api, snapshot))
+        logger.debug(
+            "Extraction of {} done... (Took {:.2f} seconds)".format(
+                snapshot.ensemble_name, time.time() - start_time
+            )
+        )
+
+    def pending(self):
+        """Number of submitted snapshots that have not been written yet"""
+        return sum(not future.done() for future in self._futures)
+
+    def join(self):
+        """Wait until all submitted snapshots are written. Raises the error of
+        the first snapshot that failed, if any."""
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
 
 
 def _dump_priors(groups, rdb_api):
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ["body", "mimetype", "headers"])
+
+
+def make_etag(*parts):
+    """Return a strong ETag for the given key parts"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU cache of serialized HTTP responses.
+
+    The cache is bounded by the total size of the cached bodies. Everything is
+    dropped when `validate` is called with a different change token than the
+    previous call, ie. when an ensemble has been created or an observation
+    has been modified since the responses were cached.
+
+    """
+
+    def __init__(self, max_size=256 * 1024 ** 2):
+        self._max_size = max_size
+        self._size = 0
+        self._token = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, token):
+        with self._lock:
+            if token != self._token:
+                self._entries.clear()
+                self._size = 0
+                self._token = token
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, mimetype, headers=()):
+        if len(body) > self._max_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key).body)
+            self._entries[key] = CachedResponse(body, mimetype, list(headers))
+            self._size += len(body)
+            while self._size > self._max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def put_stream(self, key, chunks, mimetype, headers=()):
+        """Yield `chunks` and cache their concatenation once all of them have
+        been yielded. Nothing is cached if the stream is abandoned or grows
+        beyond the size of the cache."""
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if parts is not None:
+                size += len(chunk)
+                if size <= self._max_size:
+                    parts.append(chunk)
+                else:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            self.put(key, b"".join(parts), mimetype, headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
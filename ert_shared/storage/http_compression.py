@@ -0,0 +1,85 @@
+import zlib
+
+from ert_shared.storage import blob_encoding
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Responses smaller than this are not worth the CPU time of compressing
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Binary floating point data barely shrinks, so it is sent as it is
+UNCOMPRESSED_MIMETYPES = {
+    blob_encoding.MATRIX_MIMETYPE,
+    blob_encoding.INDEXED_MATRIX_MIMETYPE,
+}
+
+# In order of preference when the client accepts several
+ENCODINGS = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def negotiate(accept_encodings):
+    """Return the best of the supported encodings in the parsed
+    Accept-Encoding header `accept_encodings`, or None to send the response
+    uncompressed"""
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def _compressobj(encoding):
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError("Unsupported encoding: {}".format(encoding))
+
+
+def compress(body, encoding):
+    compressor = _compressobj(encoding)
+    return compressor.compress(body) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Compress the str or bytes `chunks` as a single stream, yielding the
+    compressed data as soon as the compressor emits it"""
+    compressor = _compressobj(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response, encoding, min_size=None):
+    """Compress the body of a successful `response` with `encoding`.
+
+    Streamed responses are always compressed, since their size isn't known
+    before they are sent. Other responses are left as they are if their body
+    is smaller than `min_size`, which defaults to `MIN_SIZE`.
+
+    """
+    response.vary.add("Accept-Encoding")
+    if (
+        encoding is None
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype in UNCOMPRESSED_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < (MIN_SIZE if min_size is None else min_size):
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
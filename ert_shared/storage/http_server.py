@@ -7,15 +7,29 @@ import json
 import sys
 import socket
 import datetime
+import logging
 from ert_shared.storage.storage_api import StorageApi
 from pathlib import Path
+from urllib.parse import urlsplit
 from flask import Response, request, abort, jsonify
 from gunicorn.app.base import BaseApplication
+from sqlalchemy.orm import configure_mappers
+from werkzeug.exceptions import HTTPException
 from subprocess import Popen, PIPE
-from ert_shared.storage import ERT_STORAGE, connection
+from ert_shared.storage import ERT_STORAGE, blob_encoding, connection
 from ert_shared.storage.rdb_api import RdbApi
 from ert_shared.storage.blob_api import BlobApi
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import wraps
+from ert_shared.storage import http_compression
+from ert_shared.storage.http_cache import ResponseCache, make_etag
+
+logger = logging.getLogger(__name__)
+
+# Formats that batched views may respond with, since the bodies are embedded
+# in the JSON response of the batch
+BATCH_ACCEPT = "application/json, text/*"
 
 
 def generate_authtoken():
@@ -23,6 +37,26 @@ def generate_authtoken():
     return "".join([random.choice(chars) for _ in range(16)])
 
 
+def listing_args():
+    """Return the `limit`, `offset` and `fields` query arguments as keyword
+    arguments for the listing methods of StorageApi. Aborts with 400 on
+    malformed values."""
+    kwargs = {}
+    for key in ("limit", "offset"):
+        if key in request.args:
+            try:
+                kwargs[key] = int(request.args[key])
+            except ValueError:
+                abort(400)
+            if kwargs[key] < 0:
+                abort(400)
+    if "fields" in request.args:
+        kwargs["fields"] = [
+            field for field in request.args["fields"].split(",") if field
+        ]
+    return kwargs
+
+
 def resolve_ensemble_uri(ensemble_ref):
     BASE_URL = request.host_url
     return "{}ensembles/{}".format(BASE_URL, ensemble_ref)
@@ -61,8 +95,11 @@ def resolve_ref_uri(struct, ensemble_id=None):
 
 
 class FlaskWrapper:
-    def __init__(self, rdb_url, blob_url, secure=True):
-        ERT_STORAGE.initialize(rdb_url=rdb_url, blob_url=blob_url)
+    def __init__(self, rdb_url, blob_url, secure=True, engine_profile="default"):
+        ERT_STORAGE.initialize(
+            rdb_url=rdb_url, blob_url=blob_url, engine_profile=engine_profile
+        )
+        self._cache = ResponseCache()
 
         app = flask.Flask("ert http api")
         self.app = app
@@ -79,36 +116,51 @@ class FlaskWrapper:
                 if un != "__token__" or pw != self.authtoken:
                     abort(401)
 
-        self.app.add_url_rule("/ensembles", "ensembles", self.ensembles)
+        self.app.add_url_rule("/ensembles", "ensembles", self._cached(self.ensembles))
         self.app.add_url_rule(
-            "/ensembles/<ensemble_id>", "ensemble", self.ensemble_by_id
+            "/ensembles/<ensemble_id>", "ensemble", self._cached(self.ensemble_by_id)
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/realizations/<realization_idx>",
             "realization",
-            self.realization_by_id,
+            self._cached(self.realization_by_id),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/responses/<response_name>",
             "response",
-            self.response_by_name,
+            self._cached(self.response_by_name),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/responses/<response_name>/summary",
+            "response_summary",
+            self._cached(self.response_summary_by_name),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/responses/<response_name>/misfits",
+            "response_misfits",
+            self._cached(self.response_misfits_by_name),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/responses/<response_name>/data",
             "response_data",
-            self.response_data_by_name,
+            self._cached(self.response_data_by_name),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/responses/<response_name>/statistics",
+            "response_statistics",
+            self._cached(self.response_statistics_by_name),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/parameters/<parameter_def_id>",
             "parameter",
-            self.parameter_by_id,
+            self._cached(self.parameter_by_id),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/parameters/<parameter_def_id>/data",
             "parameter_data",
-            self.parameter_data_by_id,
+            self._cached(self.parameter_data_by_id),
         )
-        self.app.add_url_rule("/data/<int:data_id>", "data", self.data)
+        self.app.add_url_rule("/data/<int:data_id>", "data", self._cached(self.data))
 
         self.app.add_url_rule(
             "/observation/<name>",
@@ -128,6 +180,7 @@ class FlaskWrapper:
             self.set_observation_attributes,
             methods=["POST"],
         )
+        self.app.add_url_rule("/batch", "batch", self.batch, methods=["POST"])
         self.app.add_url_rule("/shutdown", "shutdown", self.shutdown, methods=["POST"])
         self.app.add_url_rule(
             "/schema.json",
@@ -140,6 +193,73 @@ class FlaskWrapper:
         def healthcheck():
             return jsonify({"date": datetime.datetime.now().isoformat()})
 
+        @app.after_request
+        def compress(response):
+            return http_compression.compress_response(
+                response, http_compression.negotiate(request.accept_encodings)
+            )
+
+    def _cached(self, view):
+        """Wrap a view of immutable ensemble data with ETag support and an
+        in-process cache of its serialized response.
+
+        Stored data is only ever added to, never modified, so a response only
+        depends on the view arguments, the negotiated format and encoding and
+        the rows in the database, which the change token tracks. Ensembles that
+        are extracted incrementally get new realizations, responses, parameters
+        and misfits appended, which changes the token as well.
+
+        """
+
+        @wraps(view)
+        def cached_view(**kwargs):
+            with self.session() as api:
+                token = api.get_change_token()
+            self._cache.validate(token)
+            encoding = http_compression.negotiate(request.accept_encodings)
+            etag = make_etag(
+                view.__name__,
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                request.host_url,
+                request.headers.get("Accept"),
+                encoding,
+                token,
+            )
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                cached = self._cache.get(etag)
+                if cached is not None:
+                    response = Response(
+                        cached.body, mimetype=cached.mimetype, headers=cached.headers
+                    )
+                else:
+                    response = flask.make_response(view(**kwargs))
+                    if response.status_code == 200:
+                        # Cache the compressed body, so that it is only
+                        # compressed once
+                        http_compression.compress_response(response, encoding)
+                        headers = [
+                            (key, value)
+                            for key, value in response.headers
+                            if key not in ("Content-Type", "Content-Length")
+                        ]
+                        if response.is_streamed:
+                            # Cached once the whole body has been sent
+                            response.response = self._cache.put_stream(
+                                etag, response.response, response.mimetype, headers
+                            )
+                        else:
+                            self._cache.put(
+                                etag, response.get_data(), response.mimetype, headers
+                            )
+            response.set_etag(etag)
+            response.vary.add("Accept")
+            return response
+
+        return cached_view
+
     def schema(self):
         cur_path = Path(__file__).parent
         schema_file = cur_path / "oas.yml"
@@ -148,13 +268,19 @@ class FlaskWrapper:
 
     def ensembles(self):
         with self.session() as api:
-            ensembles = api.get_ensembles()
+            try:
+                ensembles = api.get_ensembles(**listing_args())
+            except ValueError:
+                abort(400)
             resolve_ref_uri(ensembles)
             return ensembles
 
     def ensemble_by_id(self, ensemble_id):
         with self.session() as api:
-            ensemble = api.get_ensemble(ensemble_id)
+            try:
+                ensemble = api.get_ensemble(ensemble_id, **listing_args())
+            except ValueError:
+                abort(400)
             if ensemble is None:
                 abort(404)
             resolve_ref_uri(ensemble, ensemble_id)
@@ -177,12 +303,62 @@ class FlaskWrapper:
             resolve_ref_uri(response, ensemble_id)
             return response
 
+    def response_summary_by_name(self, ensemble_id, response_name):
+        with self.session() as api:
+            response = api.get_response_summary(ensemble_id, response_name)
+            if response is None:
+                abort(404)
+            resolve_ref_uri(response, ensemble_id)
+            response["alldata_url"] = "{}/responses/{}/data".format(
+                resolve_ensemble_uri(ensemble_id), response_name
+            )
+            return response
+
+    def response_misfits_by_name(self, ensemble_id, response_name):
+        kwargs = listing_args()
+        if "fields" in kwargs:
+            abort(400)
+        if "realization" in request.args:
+            try:
+                kwargs["realization_index"] = int(request.args["realization"])
+            except ValueError:
+                abort(400)
+        with self.session() as api:
+            misfits = api.get_response_misfits(ensemble_id, response_name, **kwargs)
+            if misfits is None:
+                abort(404)
+            resolve_ref_uri(misfits, ensemble_id)
+            return misfits
+
     def response_data_by_name(self, ensemble_id, response_name):
         with self.session() as api:
-            ids = api.get_response_data(ensemble_id, response_name)
-            if ids is None:
+            refs = api.get_response_data_refs(ensemble_id, response_name)
+            if refs is None:
                 abort(404)
-            return self._datas(ids)
+            return self._datas(refs)
+
+    def response_statistics_by_name(self, ensemble_id, response_name):
+        kwargs = {}
+        if "quantiles" in request.args:
+            try:
+                kwargs["quantiles"] = [
+                    float(quantile)
+                    for quantile in request.args["quantiles"].split(",")
+                    if quantile
+                ]
+            except ValueError:
+                abort(400)
+        with self.session() as api:
+            try:
+                statistics = api.get_response_statistics(
+                    ensemble_id, response_name, **kwargs
+                )
+            except ValueError:
+                abort(400)
+            if statistics is None:
+                abort(404)
+            resolve_ref_uri(statistics, ensemble_id)
+            return statistics
 
     def parameter_by_id(self, ensemble_id, parameter_def_id):
         with self.session() as api:
@@ -195,10 +371,10 @@ class FlaskWrapper:
 
     def parameter_data_by_id(self, ensemble_id, parameter_def_id):
         with self.session() as api:
-            ids = api.get_parameter_data(ensemble_id, parameter_def_id)
-            if ids is None:
+            refs = api.get_parameter_data_refs(ensemble_id, parameter_def_id)
+            if refs is None:
                 abort(404)
-            return self._datas(ids)
+            return self._datas(refs)
 
     def data(self, data_id):
         with self.session() as api:
@@ -210,7 +386,24 @@ class FlaskWrapper:
             else:
                 return str(data)
 
-    def _datas(self, ids):
+    def _datas(self, refs):
+        """Respond with the blobs of the (realization index, blob id) pairs
+        `refs`, as CSV, a matrix or a matrix with the realization indexes,
+        depending on the Accept header"""
+        best = request.accept_mimetypes.best_match(
+            [
+                "text/csv",
+                blob_encoding.MATRIX_MIMETYPE,
+                blob_encoding.INDEXED_MATRIX_MIMETYPE,
+            ]
+        )
+        indexes = [index for index, _ in refs]
+        ids = [id for _, id in refs]
+        if best == blob_encoding.MATRIX_MIMETYPE:
+            return self._data_matrix(ids)
+        if best == blob_encoding.INDEXED_MATRIX_MIMETYPE:
+            return self._data_matrix(ids, indexes)
+
         def generator():
             with self.session() as api:
                 first = True
@@ -228,6 +421,27 @@ class FlaskWrapper:
         response.headers["Content-Disposition"] = "attachment; filename=data.csv"
         return response
 
+    def _data_matrix(self, ids, indexes=None):
+        def generator():
+            with self.session() as api:
+                if indexes is None:
+                    yield from blob_encoding.stream_matrix(
+                        api.get_arrays(ids), len(ids)
+                    )
+                else:
+                    yield from blob_encoding.stream_indexed_matrix(
+                        indexes, api.get_arrays(ids)
+                    )
+
+        mimetype = (
+            blob_encoding.MATRIX_MIMETYPE
+            if indexes is None
+            else blob_encoding.INDEXED_MATRIX_MIMETYPE
+        )
+        response = Response(generator(), mimetype=mimetype)
+        response.headers["Content-Disposition"] = "attachment; filename=data.npy"
+        return response
+
     def get_observation(self, name):
         """Return an observation."""
         with self.session() as api:
@@ -271,10 +485,79 @@ class FlaskWrapper:
                     abort(404)
             return api.get_observation(name), 201
 
+    def batch(self):
+        """Perform several GET requests in one round trip.
+
+        The posted JSON is expected to be
+        {
+            "urls": ["http://host:port/ensembles/1/responses/FOPR", ...]
+        }
+
+        and the result is a list of responses in the same order,
+        {
+            "responses": [
+                {"status": 200, "mimetype": "application/json", "body": {...}},
+                {"status": 200, "mimetype": "text/html", "body": "1,2,3"},
+                {"status": 404, "mimetype": ..., "body": null},
+                ...
+            ]
+        }
+        """
+        js = request.get_json()
+        if js is None or not isinstance(js.get("urls"), list):
+            abort(400)
+
+        adapter = self.app.url_map.bind_to_environ(request.environ)
+        return {"responses": [self._batch_get(adapter, url) for url in js["urls"]]}
+
+    def _batch_get(self, adapter, url):
+        try:
+            endpoint, args = adapter.match(urlsplit(url).path, method="GET")
+            # Run the view in a context of its own so that it sees the query
+            # string of the batched url. The bodies are embedded in JSON, so
+            # only textual formats are accepted whatever the batch request
+            # itself accepts.
+            with self.app.test_request_context(url, headers={"Accept": BATCH_ACCEPT}):
+                response = flask.make_response(
+                    self.app.view_functions[endpoint](**args)
+                )
+                if response.is_json:
+                    body = response.get_json()
+                else:
+                    body = response.get_data(as_text=True)
+        except HTTPException as e:
+            return {"status": e.code, "mimetype": None, "body": None}
+        except UnicodeDecodeError:
+            return {"status": 406, "mimetype": None, "body": None}
+        except Exception:
+            # Don't fail the other requests of the batch
+            logger.exception("Batched request for %s failed", url)
+            return {"status": 500, "mimetype": None, "body": None}
+
+        return {
+            "status": response.status_code,
+            "mimetype": response.mimetype,
+            "body": body,
+        }
+
     def shutdown(self):
         request.environ.get("werkzeug.server.shutdown")()
         return "Server shutting down."
 
+    def warm_up(self):
+        """Configure the ORM and run a first query, so that the server processes
+        forked afterwards don't pay for it on their first request"""
+        configure_mappers()
+        with self.session() as api:
+            api.get_change_token()
+        # Don't hand open database connections to the forked processes
+        ERT_STORAGE.reconnect()
+
+    def post_fork(self):
+        """Prepare a forked server process for handling requests"""
+        ERT_STORAGE.reconnect()
+        self._cache.clear()
+
     @contextmanager
     def session(self):
         """Provide a transactional scope around a series of operations."""
@@ -296,22 +579,33 @@ class FlaskWrapper:
 
 
 class Application(BaseApplication):
-    def __init__(self, wrapper, lockfile):
+    def __init__(self, wrapper, lockfile, options=None, unix_socket=None):
         self.wrapper = wrapper
         self.lockfile = lockfile
+        self.options = options or {}
+        self.unix_socket = unix_socket
         super().__init__()
 
     def load_config(self):
-        self.cfg.set("bind", ["0.0.0.0:0"])
+        bind = ["0.0.0.0:0"]
+        if self.unix_socket is not None:
+            bind.append(f"unix:{self.unix_socket}")
+        self.cfg.set("bind", bind)
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
         self.cfg.set("when_ready", self.when_ready)
+        self.cfg.set("post_fork", self.post_fork)
         self.cfg.set("on_exit", self.on_exit)
 
     def load(self):
         return self.wrapper.app
 
     def when_ready(self, server):
-        assert len(server.LISTENERS) == 1
-        sock = server.LISTENERS[0].sock
+        sock = next(
+            listener.sock
+            for listener in server.LISTENERS
+            if listener.sock.family != socket.AF_UNIX
+        )
         bind_host, bind_port = sock.getsockname()[:2]
 
         print(f"Started on {bind_host}:{bind_port}")
@@ -321,19 +615,23 @@ class Application(BaseApplication):
             f"curl -u __token__:{self.wrapper.authtoken} {bind_host}:{bind_port}/ensembles"
         )
 
-        connection_info = json.dumps(
-            {
-                "urls": [
-                    f"http://{host}:{bind_port}"
-                    for host in (
-                        "127.0.0.1",
-                        socket.gethostname(),
-                        socket.getfqdn(),
-                    )
-                ],
-                "authtoken": self.wrapper.authtoken,
-            }
-        )
+        # Look up the host names while the ORM is warming up, since getfqdn()
+        # may have to wait for DNS
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            hostnames = executor.submit(
+                lambda: [socket.gethostname(), socket.getfqdn()]
+            )
+            self.wrapper.warm_up()
+            hosts = ["127.0.0.1"] + hostnames.result()
+
+        connection_info = {
+            "urls": [f"http://{host}:{bind_port}" for host in hosts],
+            "port": bind_port,
+            "authtoken": self.wrapper.authtoken,
+        }
+        if self.unix_socket is not None:
+            connection_info["unix_socket"] = str(self.unix_socket)
+        connection_info = json.dumps(connection_info)
 
         if self.lockfile:
             self.lockfile.write_text(connection_info)
@@ -344,6 +642,9 @@ class Application(BaseApplication):
             with os.fdopen(int(fd), "w") as fo:
                 fo.write(connection_info)
 
+    def post_fork(self, server, worker):
+        self.wrapper.post_fork()
+
     def on_exit(self, server):
         if self.lockfile:
             self.lockfile.unlink()
@@ -362,7 +663,11 @@ def run_server(args=None):
     if args is None:
         args = parse_args()
 
-    wrapper = FlaskWrapper(rdb_url=args.rdb_url, blob_url=args.blob_url)
+    wrapper = FlaskWrapper(
+        rdb_url=args.rdb_url,
+        blob_url=args.blob_url,
+        engine_profile=args.engine_profile,
+    )
 
     runpath = Path(args.runpath)
     assert runpath.is_dir()
@@ -373,7 +678,19 @@ def run_server(args=None):
         if lock.exists():
             raise RuntimeError("storage_server.json already exists")
 
-    Application(wrapper, lock).run()
+    Application(
+        wrapper,
+        lock,
+        options={
+            "workers": args.workers,
+            "worker_class": args.worker_class,
+            # gunicorn replaces the sync worker with gthread when threads > 1
+            "threads": args.threads if args.worker_class == "gthread" else 1,
+            "timeout": args.timeout,
+            "graceful_timeout": args.graceful_timeout,
+        },
+        unix_socket=connection.socket_path() if args.unix_socket else None,
+    ).run()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 from ert_shared.storage.entities_model import (
+    AttributeValue,
     Ensemble,
     Observation,
     Parameter,
@@ -14,8 +15,8 @@ from ert_shared.storage.entities_model import (
     Misfit,
     ParameterPrior,
 )
-from sqlalchemy import create_engine, desc
-from sqlalchemy.orm import Bundle
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.orm import Bundle, contains_eager, joinedload, selectinload
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
 
@@ -24,42 +25,88 @@ class RdbApi:
     def __init__(self, session):
         self._session = session
 
+        # Identity caches for lookups that are repeated many times during an
+        # extraction, keyed on:
+        #   ensemble name
+        #   (ensemble_id, realization index)
+        #   (response name, ensemble_id)
+        #   (parameter name, group, ensemble_id)
+        # Only hits are cached, and the add_* methods invalidate the entries
+        # they could change.
+        self._ensemble_cache = {}
+        self._realization_cache = {}
+        self._response_definition_cache = {}
+        self._parameter_definition_cache = {}
+
+    def clear_cache(self):
+        """Forget all cached lookups. Must be called if the session is rolled
+        back but reused afterwards."""
+        self._ensemble_cache.clear()
+        self._realization_cache.clear()
+        self._response_definition_cache.clear()
+        self._parameter_definition_cache.clear()
+
     def get_ensemble(self, name):
-        return (
-            self._session.query(Ensemble)
-            .filter_by(name=name)
-            .order_by(desc(Ensemble.time_created))
-            .first()
-        )
+        ensemble = self._ensemble_cache.get(name)
+        if ensemble is None:
+            ensemble = (
+                self._session.query(Ensemble)
+                .filter_by(name=name)
+                .order_by(desc(Ensemble.time_created))
+                .first()
+            )
+            if ensemble is not None:
+                self._ensemble_cache[name] = ensemble
+        return ensemble
+
+    def _get_realization(self, ensemble_id, index):
+        key = (ensemble_id, index)
+        realization = self._realization_cache.get(key)
+        if realization is None:
+            realization = (
+                self._session.query(Realization)
+                .filter_by(ensemble_id=ensemble_id, index=index)
+                .first()
+            )
+            if realization is not None:
+                self._realization_cache[key] = realization
+        return realization
 
     def get_realization(self, index, ensemble_name):
         ensemble = self.get_ensemble(name=ensemble_name)
-        return (
-            self._session.query(Realization)
-            .filter_by(ensemble_id=ensemble.id, index=index)
-            .first()
-        )
+        return self._get_realization(ensemble_id=ensemble.id, index=index)
 
     def _get_response_definition(self, name, ensemble_id):
-        return (
-            self._session.query(ResponseDefinition)
-            .filter_by(name=name, ensemble_id=ensemble_id)
-            .one()
-        )
+        key = (name, ensemble_id)
+        response_definition = self._response_definition_cache.get(key)
+        if response_definition is None:
+            response_definition = (
+                self._session.query(ResponseDefinition)
+                .filter_by(name=name, ensemble_id=ensemble_id)
+                .one()
+            )
+            self._response_definition_cache[key] = response_definition
+        return response_definition
 
     def _get_parameter_definition(self, name, group, ensemble_id):
-        return (
-            self._session.query(ParameterDefinition)
-            .filter_by(name=name, group=group, ensemble_id=ensemble_id)
-            .first()
-        )
+        key = (name, group, ensemble_id)
+        parameter_definition = self._parameter_definition_cache.get(key)
+        if parameter_definition is None:
+            parameter_definition = (
+                self._session.query(ParameterDefinition)
+                .filter_by(name=name, group=group, ensemble_id=ensemble_id)
+                .first()
+            )
+            if parameter_definition is not None:
+                self._parameter_definition_cache[key] = parameter_definition
+        return parameter_definition
 
     def get_response(self, name, realization_index, ensemble_name):
         realization = self.get_realization(
             index=realization_index, ensemble_name=ensemble_name
         )
         response_definition = self._get_response_definition(
-            name=name, ensemble_id=realization.ensemble.id
+            name=name, ensemble_id=realization.ensemble_id
         )
         return (
             self._session.query(Response)
@@ -93,7 +140,7 @@ class RdbApi:
             index=realization_index, ensemble_name=ensemble_name
         )
         parameter_definition = self._get_parameter_definition(
-            name=name, group=group, ensemble_id=realization.ensemble.id
+            name=name, group=group, ensemble_id=realization.ensemble_id
         )
         return (
             self._session.query(Parameter)
@@ -120,6 +167,7 @@ class RdbApi:
 
         ensemble = Ensemble(name=name, priors=priors)
         self._session.add(ensemble)
+        self._ensemble_cache.pop(name, None)
         if reference is not None:
             msg = "Adding ensemble '{}' as reference. '{}' is used on this update step."
             logger.info(msg.format(reference[0], reference[1]))
@@ -140,6 +188,7 @@ class RdbApi:
 
         realization = Realization(index=index)
         ensemble.realizations.append(realization)
+        self._realization_cache.pop((ensemble.id, index), None)
 
         self._session.add(realization)
         self._session.flush()
@@ -162,6 +211,7 @@ class RdbApi:
             ensemble_id=ensemble.id,
         )
         self._session.add(response_definition)
+        self._response_definition_cache.pop((name, ensemble.id), None)
         self._session.flush()
         return response_definition
 
@@ -179,7 +229,7 @@ class RdbApi:
             index=realization_index, ensemble_name=ensemble_name
         )
         response_definition = self._get_response_definition(
-            name=name, ensemble_id=realization.ensemble.id
+            name=name, ensemble_id=realization.ensemble_id
         )
         response = Response(
             values_ref=values_ref,
@@ -190,6 +240,34 @@ class RdbApi:
         self._session.flush()
         return response
 
+    def add_responses_bulk(self, name, values_refs, ensemble_name):
+        """Add responses for many realizations of the same response definition.
+
+        `values_refs` maps realization index to the blob id of the values.
+        The ensemble, response definition and realizations are resolved once
+        and the rows are written with a single executemany.
+        """
+        msg = "Adding {} responses with name '{}' on ensemble '{}'"
+        logger.info(msg.format(len(values_refs), name, ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        response_definition = self._get_response_definition(
+            name=name, ensemble_id=ensemble.id
+        )
+        realization_ids = self.get_realization_ids(ensemble_id=ensemble.id)
+        self._session.bulk_insert_mappings(
+            Response,
+            [
+                {
+                    "values_ref": values_ref,
+                    "realization_id": realization_ids[realization_index],
+                    "response_definition_id": response_definition.id,
+                }
+                for realization_index, values_ref in values_refs.items()
+            ],
+        )
+        self._session.flush()
+
     def add_parameter_definition(self, name, group, ensemble_name, prior=None):
         msg = (
             "Adding parameter definition with name '{}' in group '{}' on ensemble '{}'"
@@ -205,6 +283,7 @@ class RdbApi:
             prior_id=prior.id if prior is not None else None,
         )
         self._session.add(parameter_definition)
+        self._parameter_definition_cache.pop((name, group, ensemble.id), None)
         self._session.flush()
         return parameter_definition
 
@@ -228,7 +307,7 @@ class RdbApi:
         )
 
         parameter_definition = self._get_parameter_definition(
-            name=name, group=group, ensemble_id=realization.ensemble.id
+            name=name, group=group, ensemble_id=realization.ensemble_id
         )
         parameter = Parameter(
             value_ref=value_ref,
@@ -239,6 +318,33 @@ class RdbApi:
         self._session.flush()
         return parameter
 
+    def add_parameters_bulk(self, name, group, value_refs, ensemble_name):
+        """Add parameters for many realizations of the same parameter
+        definition.
+
+        `value_refs` maps realization index to the blob id of the value.
+        """
+        msg = "Adding {} parameters with name '{}', group '{}', ensemble '{}'"
+        logger.info(msg.format(len(value_refs), name, group, ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        parameter_definition = self._get_parameter_definition(
+            name=name, group=group, ensemble_id=ensemble.id
+        )
+        realization_ids = self.get_realization_ids(ensemble_id=ensemble.id)
+        self._session.bulk_insert_mappings(
+            Parameter,
+            [
+                {
+                    "value_ref": value_ref,
+                    "realization_id": realization_ids[realization_index],
+                    "parameter_definition_id": parameter_definition.id,
+                }
+                for realization_index, value_ref in value_refs.items()
+            ],
+        )
+        self._session.flush()
+
     def add_observation(
         self, name, key_indexes_ref, data_indexes_ref, values_ref, stds_ref
     ):
@@ -274,6 +380,19 @@ class RdbApi:
         self._session.flush()
         return link
 
+    def _get_observation_response_definition_link(
+        self, observation_id, response_definition_id, update_id
+    ):
+        return (
+            self._session.query(ObservationResponseDefinitionLink)
+            .filter_by(
+                observation_id=observation_id,
+                response_definition_id=response_definition_id,
+                update_id=update_id,
+            )
+            .one_or_none()
+        )
+
     def _add_misfit(self, value, link_id, response_id):
         msg = "Adding misfit ({}) between response with id '{}' and link with id '{}'"
         logger.info(msg.format(value, response_id, link_id))
@@ -287,6 +406,25 @@ class RdbApi:
         self._session.flush()
         return misfit
 
+    def _add_misfits_bulk(self, link_id, values):
+        """Add misfits for one observation link. `values` maps response id to
+        misfit value."""
+        msg = "Adding {} misfits for link with id '{}'"
+        logger.info(msg.format(len(values), link_id))
+
+        self._session.bulk_insert_mappings(
+            Misfit,
+            [
+                {
+                    "value": value,
+                    "observation_response_definition_link_id": link_id,
+                    "response_id": response_id,
+                }
+                for response_id, value in values.items()
+            ],
+        )
+        self._session.flush()
+
     def add_observation_attribute(self, name, attribute, value):
         """Add an attribute-value pair to an observation.
 
@@ -325,21 +463,109 @@ class RdbApi:
     def get_all_observation_keys(self):
         return [obs.name for obs in self._session.query(Observation.name).all()]
 
-    def get_all_ensembles(self):
-        return [ensemble for ensemble in self._session.query(Ensemble).all()]
+    def get_change_token(self):
+        """Return a value that changes whenever an ensemble is created, data is
+        appended to an ensemble or an observation attribute is set. Used to
+        validate cached responses."""
+        query = self._session.query
+        row = query(
+            query(func.count(Ensemble.id)).label("ensembles"),
+            query(func.max(Ensemble.id)).label("last_ensemble"),
+            query(func.max(Realization.id)).label("last_realization"),
+            query(func.max(Response.id)).label("last_response"),
+            query(func.max(Parameter.id)).label("last_parameter"),
+            query(func.max(Misfit.id)).label("last_misfit"),
+            query(func.max(ObservationResponseDefinitionLink.id)).label("last_link"),
+            query(func.max(AttributeValue.id)).label("last_attribute"),
+        ).one()
+        return tuple(row)
+
+    def get_all_ensembles(self, limit=None, offset=None, relatives=True):
+        """Return the ensembles ordered by id. Parents and children are loaded
+        up front unless `relatives` is False, so that listing them does not
+        issue one query per ensemble."""
+        query = self._session.query(Ensemble).order_by(Ensemble.id)
+        if relatives:
+            query = query.options(
+                selectinload(Ensemble.parent).joinedload(Update.ensemble_reference),
+                selectinload(Ensemble.children).joinedload(Update.ensemble_result),
+            )
+        return query.offset(offset).limit(limit).all()
 
-    def get_realizations_by_ensemble_id(self, ensemble_id):
-        return self._session.query(Realization).filter_by(ensemble_id=ensemble_id)
+    def count_ensembles(self):
+        return self._session.query(func.count(Ensemble.id)).scalar()
 
-    def get_realization_by_realization_idx(self, ensemble_id, realization_idx):
-        try:
-            return (
-                self._session.query(Realization)
-                .filter_by(ensemble_id=ensemble_id, index=realization_idx)
-                .one()
+    def get_realizations_by_ensemble_id(self, ensemble_id, limit=None, offset=None):
+        return (
+            self._session.query(Realization)
+            .filter_by(ensemble_id=ensemble_id)
+            .order_by(Realization.index)
+            .offset(offset)
+            .limit(limit)
+        )
+
+    def get_realization_ids(self, ensemble_id):
+        """Return a dict mapping realization index to realization id"""
+        return dict(
+            self._session.query(Realization.index, Realization.id).filter_by(
+                ensemble_id=ensemble_id
             )
-        except NoResultFound:
-            return None
+        )
+
+    def get_response_ids(self, ensemble_id):
+        """Return a dict mapping response name to a dict from realization index
+        to response id, for all responses in the ensemble"""
+        response_ids = {}
+        query = (
+            self._session.query(ResponseDefinition.name, Realization.index, Response.id)
+            .join(Response, Response.response_definition_id == ResponseDefinition.id)
+            .join(Realization, Response.realization_id == Realization.id)
+            .filter(ResponseDefinition.ensemble_id == ensemble_id)
+        )
+        for name, index, response_id in query:
+            response_ids.setdefault(name, {})[index] = response_id
+        return response_ids
+
+    def get_response_realization_indexes(self, ensemble_id):
+        """Return a dict mapping the name of each response definition in the
+        ensemble to the set of realization indexes that have a response"""
+        stored = {}
+        query = (
+            self._session.query(ResponseDefinition.name, Realization.index)
+            .outerjoin(
+                Response, Response.response_definition_id == ResponseDefinition.id
+            )
+            .outerjoin(Realization, Response.realization_id == Realization.id)
+            .filter(ResponseDefinition.ensemble_id == ensemble_id)
+        )
+        for name, index in query:
+            indexes = stored.setdefault(name, set())
+            if index is not None:
+                indexes.add(index)
+        return stored
+
+    def get_parameter_realization_indexes(self, ensemble_id):
+        """Return a dict mapping the (group, name) of each parameter definition
+        in the ensemble to the set of realization indexes that have a value"""
+        stored = {}
+        query = (
+            self._session.query(
+                ParameterDefinition.group, ParameterDefinition.name, Realization.index
+            )
+            .outerjoin(
+                Parameter, Parameter.parameter_definition_id == ParameterDefinition.id
+            )
+            .outerjoin(Realization, Parameter.realization_id == Realization.id)
+            .filter(ParameterDefinition.ensemble_id == ensemble_id)
+        )
+        for group, name, index in query:
+            indexes = stored.setdefault((group, name), set())
+            if index is not None:
+                indexes.add(index)
+        return stored
+
+    def get_realization_by_realization_idx(self, ensemble_id, realization_idx):
+        return self._get_realization(ensemble_id=ensemble_id, index=realization_idx)
 
     def get_ensemble_by_id(self, ensemble_id):
         try:
@@ -347,9 +573,15 @@ class RdbApi:
         except NoResultFound:
             return None
 
-    def get_response_definitions_by_ensemble_id(self, ensemble_id):
-        return self._session.query(ResponseDefinition).filter_by(
-            ensemble_id=ensemble_id
+    def get_response_definitions_by_ensemble_id(
+        self, ensemble_id, limit=None, offset=None
+    ):
+        return (
+            self._session.query(ResponseDefinition)
+            .filter_by(ensemble_id=ensemble_id)
+            .order_by(ResponseDefinition.id)
+            .offset(offset)
+            .limit(limit)
         )
 
     def get_response_by_realization_id(self, response_definition_id, realization_id):
@@ -362,9 +594,16 @@ class RdbApi:
             .one()
         )
 
-    def get_parameter_definitions_by_ensemble_id(self, ensemble_id):
-        return self._session.query(ParameterDefinition).filter_by(
-            ensemble_id=ensemble_id
+    def get_parameter_definitions_by_ensemble_id(
+        self, ensemble_id, limit=None, offset=None
+    ):
+        return (
+            self._session.query(ParameterDefinition)
+            .options(joinedload(ParameterDefinition.prior))
+            .filter_by(ensemble_id=ensemble_id)
+            .order_by(ParameterDefinition.id)
+            .offset(offset)
+            .limit(limit)
         )
 
     def get_parameter_by_realization_id(self, parameter_definition_id, realization_id):
@@ -384,9 +623,6 @@ class RdbApi:
         try:
             return (
                 self._session.query(ResponseDefinition)
-                .join(
-                    Response, ResponseDefinition.id == Response.response_definition_id
-                )
                 .filter(ResponseDefinition.name == response_name)
                 .filter(ResponseDefinition.ensemble_id == ensemble_id)
                 .one()
@@ -394,6 +630,58 @@ class RdbApi:
         except NoResultFound:
             return None
 
+    def get_response_data_refs(self, response_name, ensemble_id):
+        """Return (realization index, values_ref) for every realization that
+        has the response, ordered by realization index"""
+        return (
+            self._session.query(Realization.index, Response.values_ref)
+            .join(Response, Response.realization_id == Realization.id)
+            .join(
+                ResponseDefinition,
+                ResponseDefinition.id == Response.response_definition_id,
+            )
+            .filter(ResponseDefinition.name == response_name)
+            .filter(ResponseDefinition.ensemble_id == ensemble_id)
+            .order_by(Realization.index)
+            .all()
+        )
+
+    def _responses_query(self, response_definition_id, realization_index=None):
+        query = (
+            self._session.query(Response)
+            .join(Realization, Response.realization_id == Realization.id)
+            .filter(Response.response_definition_id == response_definition_id)
+        )
+        if realization_index is not None:
+            query = query.filter(Realization.index == realization_index)
+        return query
+
+    def get_responses(
+        self, response_definition_id, realization_index=None, limit=None, offset=None
+    ):
+        """Return the responses of a response definition ordered by realization
+        index, with their realizations and summarized misfits loaded"""
+        return (
+            self._responses_query(response_definition_id, realization_index)
+            .options(
+                contains_eager(Response.realization),
+                selectinload(Response.misfits)
+                .joinedload(Misfit.observation_response_definition_link)
+                .joinedload(ObservationResponseDefinitionLink.observation),
+            )
+            .order_by(Realization.index)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    def count_responses(self, response_definition_id, realization_index=None):
+        return (
+            self._responses_query(response_definition_id, realization_index)
+            .with_entities(func.count(Response.id))
+            .scalar()
+        )
+
     def add_prior(self, group, key, function, parameter_names, parameter_values):
         msg = "Adding prior with group '{}', key '{}', function '{}'"
         logger.info(msg.format(group, key, function))
@@ -410,6 +698,22 @@ class RdbApi:
         self._session.flush()
         return prior
 
+    def get_parameter_data_refs(self, parameter_def_id, ensemble_id):
+        """Return (realization index, value_ref) for every realization that
+        has the parameter, ordered by realization index"""
+        return (
+            self._session.query(Realization.index, Parameter.value_ref)
+            .join(Parameter, Parameter.realization_id == Realization.id)
+            .join(
+                ParameterDefinition,
+                ParameterDefinition.id == Parameter.parameter_definition_id,
+            )
+            .filter(ParameterDefinition.id == parameter_def_id)
+            .filter(ParameterDefinition.ensemble_id == ensemble_id)
+            .order_by(Realization.index)
+            .all()
+        )
+
     def get_parameter_bundle(self, parameter_def_id, ensemble_id):
         try:
             parameter_bundle = (
@@ -3,12 +3,12 @@ import os
 import sys
 import threading
 import json
-import requests
 from asyncio import TimeoutError
 from select import select, PIPE_BUF
 from time import sleep
 from subprocess import Popen, TimeoutExpired
 from pathlib import Path
+from ert_shared.storage import connection
 
 
 def empty(arr):
@@ -20,7 +20,15 @@ class ServerMonitor(threading.Thread):
     TIMEOUT = 20  # Wait 20s for the server to start before panicking
     _instance = None
 
-    def __init__(self, *, rdb_url=None, blob_url=None, lockfile=True):
+    def __init__(
+        self,
+        *,
+        rdb_url=None,
+        blob_url=None,
+        lockfile=True,
+        unix_socket=True,
+        server_args=(),
+    ):
         super().__init__()
 
         self._assert_server_not_running()
@@ -34,10 +42,13 @@ class ServerMonitor(threading.Thread):
         args = []
         if not lockfile:
             args.append("--disable-lockfile")
+        if unix_socket:
+            args.append("--unix-socket")
         if blob_url:
             args.extend(("--blob-url", blob_url))
         if rdb_url:
             args.extend(("--rdb-url", rdb_url))
+        args.extend(server_args)
 
         fd_read, fd_write = os.pipe()
         self._comm_pipe = os.fdopen(fd_read)
@@ -99,16 +110,20 @@ class ServerMonitor(threading.Thread):
         if self._url is not None:
             return self._url
 
-        for url in self.fetch_connection_info()["urls"]:
-            try:
-                resp = requests.get(f"{url}/healthcheck", auth=self.fetch_auth())
-                if resp.status_code == 200:
-                    self._url = url
-                    return url
-            except requests.ConnectionError:
-                pass
-
-        raise RuntimeError("Server started, but none of the URLs provided worked")
+        # The server runs on this host, so its port on the loopback address
+        # is tried before probing the host names it advertises
+        info = self.fetch_connection_info()
+        url = None
+        if "port" in info:
+            url = connection.find_url(
+                [f"http://127.0.0.1:{info['port']}"], self.fetch_auth()
+            )
+        if url is None:
+            url = connection.find_url(info["urls"], self.fetch_auth())
+        if url is None:
+            raise RuntimeError("Server started, but none of the URLs provided worked")
+        self._url = url
+        return url
 
     def fetch_connection_info(self):
         """Retrieves the authnetication token. Blocks while the server is starting."""
@@ -1,44 +1,78 @@
+import warnings
 from io import StringIO
 
+import numpy as np
 import pandas as pd
+from ert_shared.storage import blob_encoding
 from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.rdb_api import RdbApi
 
+ENSEMBLE_MINIMAL_FIELDS = ("name", "time_created", "ensemble_ref", "parent", "children")
+ENSEMBLE_FIELDS = ENSEMBLE_MINIMAL_FIELDS + ("realizations", "responses", "parameters")
+
+# The quantiles shown by the statistics plots
+DEFAULT_QUANTILES = (0.1, 0.33, 0.5, 0.67, 0.9)
+
+
+def _select_fields(fields, available):
+    """Return the requested fields as a set, or all available fields if
+    `fields` is None. Raises a ValueError for unknown fields."""
+    if fields is None:
+        return set(available)
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise ValueError("Unknown fields: {}".format(", ".join(sorted(unknown))))
+    return set(fields)
+
 
 class StorageApi(object):
     def __init__(self, rdb_api, blob_api):
         self._rdb_api = rdb_api
         self._blob_api = blob_api
 
-    def _ensemble_minimal(self, ensemble):
+    def _ensemble_minimal(self, ensemble, fields=ENSEMBLE_MINIMAL_FIELDS):
         if ensemble is None:
             return None
-        return {
+        schema = {
             "name": ensemble.name,
             "time_created": ensemble.time_created.isoformat(),
             "ensemble_ref": ensemble.id,
-            "parent": {
-                "ensemble_ref": ensemble.parent.ensemble_reference.id,
-                "name": ensemble.parent.ensemble_reference.name,
-            }
-            if ensemble.parent is not None
-            else {},
-            "children": [
+        }
+        if "parent" in fields:
+            schema["parent"] = (
+                {
+                    "ensemble_ref": ensemble.parent.ensemble_reference.id,
+                    "name": ensemble.parent.ensemble_reference.name,
+                }
+                if ensemble.parent is not None
+                else {}
+            )
+        if "children" in fields:
+            schema["children"] = [
                 {
                     "ensemble_ref": child.ensemble_result.id,
                     "name": child.ensemble_result.name,
                 }
                 for child in ensemble.children
-            ],
-        }
-
-    def get_ensembles(self, filter=None):
-        data = [
-            self._ensemble_minimal(ensemble)
-            for ensemble in self._rdb_api.get_all_ensembles()
-        ]
+            ]
+        return {key: value for key, value in schema.items() if key in fields}
+
+    def get_change_token(self):
+        return self._rdb_api.get_change_token()
+
+    def get_ensembles(self, filter=None, limit=None, offset=None, fields=None):
+        """Return a page of ensembles ordered by creation, with `total` being
+        the number of ensembles in the database. `fields` selects which keys
+        of each ensemble to include."""
+        fields = _select_fields(fields, ENSEMBLE_MINIMAL_FIELDS)
+        ensembles = self._rdb_api.get_all_ensembles(
+            limit=limit,
+            offset=offset,
+            relatives="parent" in fields or "children" in fields,
+        )
+        data = [self._ensemble_minimal(ensemble, fields) for ensemble in ensembles]
 
-        return {"ensembles": data}
+        return {"ensembles": data, "total": self._rdb_api.count_ensembles()}
 
     def get_realization(self, ensemble_id, realization_idx, filter):
         realization = self._rdb_api.get_realization_by_realization_idx(
@@ -90,17 +124,68 @@ class StorageApi(object):
 
         return return_schema
 
-    def _calculate_misfit(
-        self, obs_value, response_values, obs_stds, obs_data_indexes, obs_index
-    ):
-        observation_std = obs_stds[obs_index]
-        response_index = obs_data_indexes[obs_index]
-        response_value = response_values[response_index]
-        difference = response_value - obs_value
-        misfit = (difference / observation_std) ** 2
-        sign = difference > 0
+    def _calculate_misfits(self, obs_values, obs_stds, obs_data_indexes, responses):
+        """Return the squared normalized residuals and their signs for every
+        realization (rows of `responses`) and observation index (columns)"""
+        differences = responses[:, obs_data_indexes] - obs_values
+        misfits = (differences / obs_stds) ** 2
+        signs = differences > 0
+        return misfits, signs
+
+    def _univariate_misfits(self, observation_links, responses):
+        """Return the misfits of every response and observation index, as
+        {realization index: {observation name: [misfit, ...]}}"""
+        univariate_misfits = {resp.realization.index: {} for resp in responses}
+        if len(responses) > 0 and len(observation_links) > 0:
+            blobs = {
+                blob.id: blob.array
+                for blob in self._blob_api.get_blobs(
+                    [resp.values_ref for resp in responses]
+                )
+            }
+            # Realizations may have responses of different lengths, e.g. summary
+            # vectors of failed runs, so responses of each length are stacked
+            # separately
+            groups = {}
+            for resp in responses:
+                groups.setdefault(np.shape(blobs[resp.values_ref]), []).append(resp)
+            response_matrices = [
+                (group, np.stack([blobs[resp.values_ref] for resp in group]))
+                for group in groups.values()
+            ]
 
-        return {"value": misfit, "sign": sign, "obs_index": obs_index}
+            for link in observation_links:
+                observation = link.observation
+                obs_values = self._blob_api.get_blob(observation.values_ref).array
+                obs_stds = self._blob_api.get_blob(observation.stds_ref).array
+                obs_data_indexes = self._blob_api.get_blob(
+                    observation.data_indexes_ref
+                ).array
+                for group, response_matrix in response_matrices:
+                    misfits, signs = self._calculate_misfits(
+                        obs_values=obs_values,
+                        obs_stds=obs_stds,
+                        obs_data_indexes=obs_data_indexes,
+                        responses=response_matrix,
+                    )
+                    for resp, misfit_row, sign_row in zip(
+                        group, misfits.tolist(), signs.tolist()
+                    ):
+                        univariate_misfits[resp.realization.index][
+                            observation.name
+                        ] = [
+                            {"value": value, "sign": sign, "obs_index": obs_index}
+                            for obs_index, (value, sign) in enumerate(
+                                zip(misfit_row, sign_row)
+                            )
+                        ]
+        return univariate_misfits
+
+    def _summarized_misfits(self, response):
+        return {
+            misfit.observation_response_definition_link.observation.name: misfit.value
+            for misfit in response.misfits
+        }
 
     def get_response(self, ensemble_id, response_name, filter):
         bundle = self._rdb_api.get_response_bundle(
@@ -111,29 +196,7 @@ class StorageApi(object):
 
         observation_links = bundle.observation_links
         responses = bundle.responses
-        univariate_misfits = {}
-        for resp in responses:
-            resp_values = list(self._blob_api.get_blob(resp.values_ref).data)
-            univariate_misfits[resp.realization.index] = {}
-            for link in observation_links:
-                observation = link.observation
-                obs_values = list(self._blob_api.get_blob(observation.values_ref).data)
-                obs_stds = list(self._blob_api.get_blob(observation.stds_ref).data)
-                obs_data_indexes = list(
-                    self._blob_api.get_blob(observation.data_indexes_ref).data
-                )
-                misfits = []
-                for obs_index, obs_value in enumerate(obs_values):
-                    misfits.append(
-                        self._calculate_misfit(
-                            obs_value,
-                            resp_values,
-                            obs_stds,
-                            obs_data_indexes,
-                            obs_index,
-                        )
-                    )
-                univariate_misfits[resp.realization.index][observation.name] = misfits
+        univariate_misfits = self._univariate_misfits(observation_links, responses)
 
         return_schema = {
             "name": response_name,
@@ -143,16 +206,8 @@ class StorageApi(object):
                     "name": resp.realization.index,
                     "realization_ref": resp.realization.index,
                     "data_ref": resp.values_ref,
-                    "summarized_misfits": {
-                        misfit.observation_response_definition_link.observation.name: misfit.value
-                        for misfit in resp.misfits
-                    },
-                    "univariate_misfits": {
-                        obs_name: misfits
-                        for obs_name, misfits in univariate_misfits[
-                            resp.realization.index
-                        ].items()
-                    },
+                    "summarized_misfits": self._summarized_misfits(resp),
+                    "univariate_misfits": univariate_misfits[resp.realization.index],
                 }
                 for resp in responses
             ],
@@ -166,16 +221,155 @@ class StorageApi(object):
 
         return return_schema
 
+    def get_response_summary(self, ensemble_id, response_name):
+        """Return a response like `get_response`, but without the misfits of the
+        realizations, which are available from `get_response_misfits`"""
+        bundle = self._rdb_api.get_response_bundle(
+            response_name=response_name, ensemble_id=ensemble_id
+        )
+        if bundle is None:
+            return None
+
+        refs = self._rdb_api.get_response_data_refs(
+            response_name=response_name, ensemble_id=ensemble_id
+        )
+        return_schema = {
+            "name": response_name,
+            "ensemble_id": ensemble_id,
+            "realizations": [
+                {"name": index, "realization_ref": index, "data_ref": values_ref}
+                for index, values_ref in refs
+            ],
+            "axis": {"data_ref": bundle.indexes_ref},
+        }
+        if len(bundle.observation_links) > 0:
+            return_schema["observations"] = [
+                self._obs_to_json(link.observation, link.active_ref)
+                for link in bundle.observation_links
+            ]
+
+        return return_schema
+
+    def get_response_misfits(
+        self,
+        ensemble_id,
+        response_name,
+        realization_index=None,
+        limit=None,
+        offset=None,
+    ):
+        """Return a page of the summarized and univariate misfits of a response,
+        ordered by realization, with `total` being the number of realizations
+        with the response. Only the misfits of the realization with
+        `realization_index` are returned if it is given."""
+        bundle = self._rdb_api.get_response_bundle(
+            response_name=response_name, ensemble_id=ensemble_id
+        )
+        if bundle is None:
+            return None
+
+        responses = self._rdb_api.get_responses(
+            bundle.id, realization_index=realization_index, limit=limit, offset=offset
+        )
+        univariate_misfits = self._univariate_misfits(
+            bundle.observation_links, responses
+        )
+        return {
+            "name": response_name,
+            "ensemble_id": ensemble_id,
+            "realizations": [
+                {
+                    "name": resp.realization.index,
+                    "realization_ref": resp.realization.index,
+                    "summarized_misfits": self._summarized_misfits(resp),
+                    "univariate_misfits": univariate_misfits[resp.realization.index],
+                }
+                for resp in responses
+            ],
+            "total": self._rdb_api.count_responses(
+                bundle.id, realization_index=realization_index
+            ),
+        }
+
     def get_response_data(self, ensemble_id, response_name):
+        """Return the ids of the response's blobs, ordered by realization"""
+        refs = self.get_response_data_refs(ensemble_id, response_name)
+        return None if refs is None else [id for _, id in refs]
+
+    def get_response_data_refs(self, ensemble_id, response_name):
+        """Return (realization index, blob id) pairs of the response, ordered
+        by realization index. Realizations without the response, e.g. failed
+        ones, are left out."""
+        refs = self._rdb_api.get_response_data_refs(
+            response_name=response_name, ensemble_id=ensemble_id
+        )
+        if len(refs) == 0:
+            bundle = self._rdb_api.get_response_bundle(
+                response_name=response_name, ensemble_id=ensemble_id
+            )
+            if bundle is None:
+                return None
+        return refs
+
+    def get_response_statistics(
+        self, ensemble_id, response_name, quantiles=DEFAULT_QUANTILES
+    ):
+        """Return the mean, standard deviation, minimum, maximum and the given
+        quantiles of a response over the realizations, for each index.
+
+        The statistics are computed like pandas does, skipping missing (NaN)
+        values, so they match what the plots computed from the full data.
+        Summary responses have missing values where the realizations have
+        different report dates. Values that are undefined, like the standard
+        deviation of a single realization, are None.
+
+        """
+        if not all(0 <= quantile <= 1 for quantile in quantiles):
+            raise ValueError("Quantiles must be between 0 and 1")
+
         bundle = self._rdb_api.get_response_bundle(
             response_name=response_name, ensemble_id=ensemble_id
         )
         if bundle is None:
             return None
-        responses = bundle.responses
+        ids = [resp.values_ref for resp in bundle.responses]
+
+        def to_list(values):
+            return [None if np.isnan(value) else value for value in values.tolist()]
 
-        ids = [resp.values_ref for resp in responses]
-        return ids
+        statistics = {
+            "name": response_name,
+            "ensemble_id": ensemble_id,
+            "realizations": len(ids),
+            "axis": {"data_ref": bundle.indexes_ref},
+        }
+        if len(ids) == 0:
+            statistics.update({"mean": [], "std": [], "min": [], "max": []})
+            statistics["quantiles"] = [
+                {"quantile": quantile, "values": []} for quantile in quantiles
+            ]
+            return statistics
+
+        matrix = self.get_data_matrix(ids).astype(np.float64)
+        with warnings.catch_warnings():
+            # Indexes without values, or with a single value for the standard
+            # deviation, warn and are None
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            statistics.update(
+                {
+                    "mean": to_list(np.nanmean(matrix, axis=0)),
+                    "std": to_list(np.nanstd(matrix, axis=0, ddof=1)),
+                    "min": to_list(np.nanmin(matrix, axis=0)),
+                    "max": to_list(np.nanmax(matrix, axis=0)),
+                }
+            )
+            statistics["quantiles"] = [
+                {"quantile": quantile, "values": to_list(values)}
+                for quantile, values in zip(
+                    quantiles, np.nanquantile(matrix, quantiles, axis=0)
+                )
+            ]
+        return statistics
 
     def get_data(self, id):
         blob = self._blob_api.get_blob(id)
@@ -183,9 +377,23 @@ class StorageApi(object):
             return None
         return blob.data
 
-    def get_datas(self, id):
-        for response in self._blob_api.get_blobs(id):
-            yield response.data
+    def get_data_matrix(self, ids):
+        """Return the blobs with the given ids as a matrix with one row per id,
+        in the order of `ids`"""
+        return blob_encoding.stack(self.get_arrays(ids))
+
+    def get_arrays(self, ids):
+        """Yield the blobs with the given ids as arrays, in the order of `ids`.
+        Blobs are read in chunks, so this can feed a streamed response."""
+        for blob in self._blob_api.get_blobs(ids):
+            yield blob.array
+
+    def get_datas(self, ids):
+        """Yield the data of the blobs with the given ids, in the order of
+        `ids`. Blobs are shared between identical values, so an id may occur
+        more than once. Ids without a blob are skipped."""
+        for blob in self._blob_api.get_blobs(ids):
+            yield blob.data
 
     def get_observation(self, name):
         obs = self._rdb_api.get_observation(name)
@@ -205,40 +413,46 @@ class StorageApi(object):
             return None
         return self._obs_to_json(obs)
 
-    def get_ensemble(self, ensemble_id):
+    def get_ensemble(self, ensemble_id, limit=None, offset=None, fields=None):
+        """Return an ensemble with its realizations, responses and parameters.
+
+        `fields` selects which keys to include, so that e.g. only the responses
+        are loaded. `limit` and `offset` page through each of the included
+        lists independently.
+
+        """
+        fields = _select_fields(fields, ENSEMBLE_FIELDS)
         ens = self._rdb_api.get_ensemble_by_id(ensemble_id)
 
         if ens is None:
             return None
 
-        return_schema = self._ensemble_minimal(ens)
-        return_schema.update(
-            {
-                "realizations": [
-                    {"name": real.index, "realization_ref": real.index}
-                    for real in self._rdb_api.get_realizations_by_ensemble_id(
-                        ensemble_id
-                    )
-                ],
-                "responses": [
-                    {"name": resp.name, "response_ref": resp.name}
-                    for resp in self._rdb_api.get_response_definitions_by_ensemble_id(
-                        ensemble_id
-                    )
-                ],
-                "parameters": [
-                    self._parameter_minimal(
-                        name=par.name,
-                        group=par.group,
-                        prior=par.prior,
-                        parameter_def_id=par.id,
-                    )
-                    for par in self._rdb_api.get_parameter_definitions_by_ensemble_id(
-                        ensemble_id
-                    )
-                ],
-            }
-        )
+        page = {"ensemble_id": ensemble_id, "limit": limit, "offset": offset}
+        return_schema = self._ensemble_minimal(ens, fields)
+        if "realizations" in fields:
+            return_schema["realizations"] = [
+                {"name": real.index, "realization_ref": real.index}
+                for real in self._rdb_api.get_realizations_by_ensemble_id(**page)
+            ]
+        if "responses" in fields:
+            return_schema["responses"] = [
+                {"name": resp.name, "response_ref": resp.name}
+                for resp in self._rdb_api.get_response_definitions_by_ensemble_id(
+                    **page
+                )
+            ]
+        if "parameters" in fields:
+            return_schema["parameters"] = [
+                self._parameter_minimal(
+                    name=par.name,
+                    group=par.group,
+                    prior=par.prior,
+                    parameter_def_id=par.id,
+                )
+                for par in self._rdb_api.get_parameter_definitions_by_ensemble_id(
+                    **page
+                )
+            ]
         return return_schema
 
     def _obs_to_json(self, obs, active_ref=None):
@@ -299,11 +513,20 @@ class StorageApi(object):
         return return_schema
 
     def get_parameter_data(self, ensemble_id, parameter_def_id):
-        bundle = self._rdb_api.get_parameter_bundle(
+        """Return the ids of the parameter's blobs, ordered by realization"""
+        refs = self.get_parameter_data_refs(ensemble_id, parameter_def_id)
+        return None if refs is None else [id for _, id in refs]
+
+    def get_parameter_data_refs(self, ensemble_id, parameter_def_id):
+        """Return (realization index, blob id) pairs of the parameter, ordered
+        by realization index"""
+        refs = self._rdb_api.get_parameter_data_refs(
             parameter_def_id=parameter_def_id, ensemble_id=ensemble_id
         )
-        if bundle is None:
-            return None
-
-        ids = [param.value_ref for param in bundle.parameters]
-        return ids
+        if len(refs) == 0:
+            bundle = self._rdb_api.get_parameter_bundle(
+                parameter_def_id=parameter_def_id, ensemble_id=ensemble_id
+            )
+            if bundle is None:
+                return None
+        return refs
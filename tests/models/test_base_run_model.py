@@ -52,3 +52,21 @@ class InMemoryBaseRunModelTest(unittest.TestCase):
         jobs, status = brm.realization_progress[0][0]
         self.assertEqual(len(jobs), 1)
         self.assertIn("name", jobs[0])
+
+    def test_extracting_waits_for_worker(self):
+        brm = BaseRunModel(None)
+        worker = Mock()
+        worker.pending.return_value = 0
+        with brm._extracting(worker) as extraction_worker:
+            self.assertIs(extraction_worker, worker)
+            worker.join.assert_not_called()
+        worker.join.assert_called_once_with()
+
+    def test_extracting_joins_worker_when_run_fails(self):
+        brm = BaseRunModel(None)
+        worker = Mock()
+        worker.join.side_effect = RuntimeError("write failed")
+        with self.assertRaises(ValueError):
+            with brm._extracting(worker):
+                raise ValueError("run failed")
+        worker.join.assert_called_once_with()
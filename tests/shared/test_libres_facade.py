@@ -72,6 +72,23 @@ class LibresFacadeTest(TestCase):
             self.assertIsInstance(dataframe, PandasObject)
             self.assertTrue(dataframe.empty)
 
+    @tmpdir(os.path.join(SOURCE_DIR, 'test-data/local/snake_oil'))
+    def test_gather_all_summary_data(self):
+        facade = self.facade()
+        keys = ['BPR:1,3,8', 'FOPR']
+        data = facade.gather_all_summary_data('default_0', keys)
+
+        self.assertEqual(list(data.keys()), keys)
+        for key in keys:
+            self.assertTrue(data[key].equals(facade.gather_summary_data('default_0', key)))
+
+        all_data = facade.gather_all_summary_data('default_0')
+        self.assertIn('FOPR', all_data)
+        self.assertTrue(all_data['FOPR'].equals(data['FOPR']))
+
+        self.assertEqual(facade.gather_all_summary_data('nocase'), {})
+        self.assertTrue(facade.gather_all_summary_data('default_0', ['nokey'])['nokey'].empty)
+
     @tmpdir(os.path.join(SOURCE_DIR, 'test-data/local/snake_oil'))
     def test_cases_list(self):
         facade = self.facade()
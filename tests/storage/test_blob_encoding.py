@@ -0,0 +1,169 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from ert_shared.storage import ErtStorage, blob_encoding
+from ert_shared.storage.blob_api import BlobApi
+from sqlalchemy import create_engine
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [11.1, 11.2, 9.9, 9.3],
+        [0, 3],
+        [True, False],
+        ["2000-01-01 20:01:01", "2000-01-02 20:01:01"],
+        2.5,
+        1,
+        [],
+    ],
+)
+@pytest.mark.parametrize("compress", [False, True])
+def test_roundtrip(data, compress):
+    payload = blob_encoding.encode(data, compress=compress)
+    assert blob_encoding.to_python(blob_encoding.decode(payload)) == data
+
+
+def test_decode_is_zero_copy():
+    payload = blob_encoding.encode(np.arange(10, dtype=np.float64))
+    array = blob_encoding.decode(payload)
+    assert array.dtype == np.dtype("<f8")
+    assert not array.flags.owndata
+    assert not array.flags.writeable
+    np.testing.assert_array_equal(array, np.arange(10))
+
+
+def test_shape_is_preserved():
+    data = np.arange(6, dtype=">i4").reshape(2, 3)
+    array = blob_encoding.decode(blob_encoding.encode(data))
+    assert array.shape == (2, 3)
+    np.testing.assert_array_equal(array, data)
+
+
+def test_timestamps():
+    dates = pd.date_range("2010-01-01", periods=3).to_list()
+    array = blob_encoding.decode(blob_encoding.encode(dates))
+    assert array.dtype.kind == "M"
+    assert [str(x) for x in blob_encoding.to_python(array)] == [
+        "2010-01-01 00:00:00",
+        "2010-01-02 00:00:00",
+        "2010-01-03 00:00:00",
+    ]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [1, "a", None],
+        [1, None],
+        [3, None, 5],
+        [True, None],
+        [1, "a"],
+        [True, 2],
+        [[1, 2], [3]],
+    ],
+)
+def test_objects_fall_back_to_pickle(data):
+    payload = blob_encoding.encode(data)
+    flags = payload[5]
+    assert flags & blob_encoding.FLAG_PICKLED
+    decoded = blob_encoding.to_python(blob_encoding.decode(payload))
+    assert decoded == data
+    assert [type(value) for value in decoded] == [type(value) for value in data]
+
+
+def test_invalid_payload():
+    with pytest.raises(ValueError):
+        blob_encoding.decode(pickle.dumps([1, 2, 3]))
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [[1.5, 2.5], [3.5, 4.5], [5.5, 6.5]],
+        [[1], [2]],
+        [2.5, 3.5],
+        [],
+    ],
+)
+def test_stream_matrix(rows):
+    arrays = [np.array(row) for row in rows]
+    chunks = list(blob_encoding.stream_matrix(arrays, len(arrays)))
+
+    assert b"".join(chunks) == blob_encoding.encode_matrix(blob_encoding.stack(arrays))
+
+
+def test_stream_matrix_casts_rows():
+    rows = [np.array([1.5, 2.5]), np.array([1, 2])]
+    payload = b"".join(blob_encoding.stream_matrix(rows, 2))
+
+    np.testing.assert_array_equal(
+        blob_encoding.decode_matrix(payload), [[1.5, 2.5], [1.0, 2.0]]
+    )
+
+
+@pytest.mark.parametrize(
+    "rows, num_rows",
+    [
+        ([[1.5, 2.5], [3.5]], 2),
+        ([[1, 2], [1.5, 2.5]], 2),
+        ([[1.5, 2.5]], 2),
+        ([], 1),
+    ],
+)
+def test_stream_matrix_invalid(rows, num_rows):
+    with pytest.raises(ValueError):
+        list(blob_encoding.stream_matrix(map(np.array, rows), num_rows))
+
+
+def test_indexed_matrix_roundtrip():
+    rows = [np.array([1.5, 2.5]), np.array([3.5, 4.5])]
+    payload = b"".join(blob_encoding.stream_indexed_matrix([3, 7], rows))
+
+    indexes, matrix = blob_encoding.decode_indexed_matrix(payload)
+    np.testing.assert_array_equal(indexes, [3, 7])
+    np.testing.assert_array_equal(matrix, rows)
+
+
+def test_migrate_pickled_blobs(tmp_path):
+    blob_url = f"sqlite:///{tmp_path}/blobs.db"
+    rdb_url = f"sqlite:///{tmp_path}/entities.db"
+    storage = ErtStorage()
+
+    engine = create_engine(blob_url)
+    storage._upgrade_database(
+        connection=engine.connect(),
+        ini_section="alembic_blob",
+        url=blob_url,
+        revision="a360248166fd",
+    )
+    values = [
+        [1.1, 2.2],
+        3,
+        ["2000-01-01 20:01:01"],
+        [True, False],
+        [1, None],
+        [3, None, 5],
+        [True, None],
+        [1, "a"],
+        [True, 2],
+        [[1, 2], [3]],
+    ]
+    with engine.begin() as conn:
+        for data in values:
+            conn.execute("INSERT INTO ert_blob (data) VALUES (?)", pickle.dumps(data))
+
+    storage.initialize(rdb_url=rdb_url, blob_url=blob_url)
+
+    session = storage.BlobSession()
+    try:
+        blob_api = BlobApi(session)
+        migrated = [blob_api.get_blob(i + 1).data for i in range(len(values))]
+        assert migrated == values
+        assert [repr(data) for data in migrated] == [repr(data) for data in values]
+        assert blob_api.add_blob(values[0]).id == 1
+        assert blob_api.get_blob(1).ref_count == 2
+    finally:
+        session.close()
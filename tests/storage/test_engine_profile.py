@@ -0,0 +1,45 @@
+import pytest
+from ert_shared.storage import ErtStorage
+
+
+def _pragma(session, name):
+    return session.execute("PRAGMA {}".format(name)).scalar()
+
+
+def test_wal_profile(tmp_path):
+    storage = ErtStorage()
+    storage.initialize(
+        rdb_url=f"sqlite:///{tmp_path}/entities.db",
+        blob_url=f"sqlite:///{tmp_path}/blobs.db",
+        engine_profile="wal",
+    )
+
+    for session in (storage.RdbSession(), storage.BlobSession()):
+        assert _pragma(session, "journal_mode") == "wal"
+        assert _pragma(session, "synchronous") == 1  # NORMAL
+        assert _pragma(session, "mmap_size") == 256 * 1024 ** 2
+        assert _pragma(session, "cache_size") == -64 * 1024
+        assert _pragma(session, "busy_timeout") == 30000
+        session.close()
+
+
+def test_default_profile(tmp_path):
+    storage = ErtStorage()
+    storage.initialize(
+        rdb_url=f"sqlite:///{tmp_path}/entities.db",
+        blob_url=f"sqlite:///{tmp_path}/blobs.db",
+    )
+
+    session = storage.RdbSession()
+    assert _pragma(session, "journal_mode") == "delete"
+    assert _pragma(session, "synchronous") == 2  # FULL
+    session.close()
+
+
+def test_unknown_profile(tmp_path):
+    with pytest.raises(KeyError):
+        ErtStorage().initialize(
+            rdb_url=f"sqlite:///{tmp_path}/entities.db",
+            blob_url=f"sqlite:///{tmp_path}/blobs.db",
+            engine_profile="fast",
+        )
@@ -1,11 +1,19 @@
+import types
+
 import pandas as pd
 import pytest
+from ert_shared.feature_toggling import FeatureToggling
+from ert_shared.storage import ErtStorage, extraction_api
+from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.extraction_api import (
+    ExtractionSnapshot,
+    ExtractionWorker,
     _dump_observations,
     _dump_parameters,
     _dump_priors,
     _dump_response,
 )
+from ert_shared.storage.rdb_api import RdbApi
 from tests.storage import apis, initialize_databases
 
 observation_data = {
@@ -197,6 +205,72 @@ def test_dump_responses(apis):
     ]
 
 
+def test_dump_responses_incremental(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="incremental_responses")
+    for i in range(5):
+        rdb_api.add_realization(i, ensemble.name)
+
+    # Realizations 1 and 3 failed in the first run
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses={"POLY_RES": poly_res[[0, 2, 4]]},
+        ensemble_name=ensemble.name,
+    )
+    stored = rdb_api.get_response_realization_indexes(ensemble.id)
+    assert stored == {"POLY_RES": {0, 2, 4}}
+    first_response = rdb_api.get_response("POLY_RES", 0, ensemble.name)
+
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses=responses,
+        ensemble_name=ensemble.name,
+        stored=stored,
+    )
+
+    assert rdb_api.get_response_realization_indexes(ensemble.id) == {
+        "POLY_RES": {0, 1, 2, 3, 4}
+    }
+    assert rdb_api.get_response("POLY_RES", 0, ensemble.name) is first_response
+    assert len(list(rdb_api.get_response_definitions_by_ensemble_id(ensemble.id))) == 1
+    response_3 = rdb_api.get_response("POLY_RES", 3, ensemble.name)
+    assert blob_api.get_blob(response_3.values_ref).data == list(poly_res[3])
+
+
+def test_dump_parameters_incremental(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="incremental_parameters")
+    for i in range(5):
+        rdb_api.add_realization(i, ensemble.name)
+
+    _dump_parameters(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        parameters={"COEFFS:COEFF_A": coeff_a.loc[[0, 1]]},
+        ensemble_name=ensemble.name,
+        priors=[],
+    )
+    stored = rdb_api.get_parameter_realization_indexes(ensemble.id)
+    assert stored == {("COEFFS", "COEFF_A"): {0, 1}}
+
+    _dump_parameters(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        parameters=parameters,
+        ensemble_name=ensemble.name,
+        priors=[],
+        stored=stored,
+    )
+
+    assert rdb_api.get_parameter_realization_indexes(ensemble.id) == {
+        ("COEFFS", "COEFF_A"): {0, 1, 2, 3, 4}
+    }
+    parameter_4 = rdb_api.get_parameter("COEFF_A", "COEFFS", 4, ensemble.name)
+    assert blob_api.get_blob(parameter_4.value_ref).data == 0.5949261230249001
+
+
 def test_dump_priors(apis):
     priors = {
         "COEFFS": [
@@ -219,3 +293,92 @@ def test_dump_priors(apis):
     }
     rdb_api, _ = apis
     _dump_priors(priors, rdb_api)
+
+
+def _snapshot(ensemble_name, reference=None, observation_key="POLY_OBS"):
+    return ExtractionSnapshot(
+        ensemble_name=ensemble_name,
+        ensemble_size=5,
+        reference=reference,
+        priors={}
+        if reference is not None
+        else {
+            "COEFFS": [
+                {
+                    "key": "COEFF_A",
+                    "function": "UNIFORM",
+                    "parameters": {"MIN": 0.0, "MAX": 1.0},
+                }
+            ]
+        },
+        observations=pd.DataFrame.from_dict(observation_data),
+        parameters=parameters,
+        responses=responses,
+        update_data=[
+            {
+                "observation_key": observation_key,
+                "response_key": "POLY_RES",
+                "active": [True, True, False, True, True],
+                "misfits": {index: float(index) for index in range(5)},
+            }
+        ],
+    )
+
+
+@pytest.fixture
+def worker_storage(tmp_path, monkeypatch):
+    storage = ErtStorage()
+    storage.initialize(
+        rdb_url=f"sqlite:///{tmp_path}/entities.db",
+        blob_url=f"sqlite:///{tmp_path}/blobs.db",
+    )
+    monkeypatch.setattr(extraction_api, "ERT_STORAGE", storage)
+    monkeypatch.setattr(extraction_api, "ERT", types.SimpleNamespace(enkf_facade=None))
+    monkeypatch.setattr(FeatureToggling._conf["new-storage"], "is_enabled", True)
+    return storage
+
+
+def test_extraction_worker(worker_storage, monkeypatch):
+    snapshots = {
+        None: _snapshot("prior"),
+        ("prior", "STD_ENKF"): _snapshot("posterior", ("prior", "STD_ENKF")),
+    }
+    monkeypatch.setattr(
+        extraction_api,
+        "_extract",
+        lambda facade, reference=None: snapshots[reference],
+    )
+
+    worker = ExtractionWorker()
+    assert worker.submit() == "prior"
+    assert worker.submit(reference=("prior", "STD_ENKF")) == "posterior"
+    worker.join()
+    assert worker.pending() == 0
+
+    rdb_api = RdbApi(worker_storage.RdbSession())
+    blob_api = BlobApi(worker_storage.BlobSession())
+    posterior = rdb_api.get_ensemble("posterior")
+    assert posterior.parent.ensemble_reference.name == "prior"
+    assert rdb_api.get_response_realization_indexes(posterior.id) == {
+        "POLY_RES": {0, 1, 2, 3, 4}
+    }
+    response = rdb_api.get_response("POLY_RES", 3, "posterior")
+    assert blob_api.get_blob(response.values_ref).data == list(poly_res[3])
+    assert [misfit.value for misfit in response.misfits] == [3.0]
+    link = response.misfits[0].observation_response_definition_link
+    assert blob_api.get_blob(link.active_ref).data == [True, True, False, True, True]
+
+
+def test_extraction_worker_error(worker_storage, monkeypatch):
+    monkeypatch.setattr(
+        extraction_api,
+        "_extract",
+        lambda facade, reference=None: _snapshot("failing", observation_key="NONE"),
+    )
+
+    worker = ExtractionWorker()
+    assert worker.submit() == "failing"
+    with pytest.raises(AttributeError):
+        worker.join()
+
+    assert RdbApi(worker_storage.RdbSession()).get_ensemble("failing") is None
@@ -0,0 +1,138 @@
+"""Timings for dumping synthetic ensembles of increasing size to storage.
+
+Run with `pytest -s tests/storage/test_extraction_benchmark.py` to see the
+timings.
+
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from ert_shared.storage.extraction_api import (
+    _dump_parameters,
+    _dump_response,
+    _dump_update_data,
+)
+from tests.storage import apis, initialize_databases
+
+NUM_RESPONSE_KEYS = 20
+NUM_PARAMETER_KEYS = 10
+NUM_TIMESTEPS = 200
+
+
+def _synthetic_ensemble(ensemble_size):
+    rng = np.random.default_rng(seed=ensemble_size)
+    dates = pd.date_range("2010-01-01", periods=NUM_TIMESTEPS, freq="D")
+    responses = {
+        f"RESPONSE_{key}": pd.DataFrame(
+            rng.random((NUM_TIMESTEPS, ensemble_size)), index=dates
+        )
+        for key in range(NUM_RESPONSE_KEYS)
+    }
+    parameters = {
+        f"GROUP:PARAM_{key}": pd.DataFrame(
+            {f"GROUP:PARAM_{key}": rng.random(ensemble_size)}
+        )
+        for key in range(NUM_PARAMETER_KEYS)
+    }
+    return responses, parameters
+
+
+@pytest.mark.parametrize("ensemble_size", [10, 50, 200])
+def test_dump_ensemble_timing(apis, ensemble_size):
+    rdb_api, blob_api = apis
+    responses, parameters = _synthetic_ensemble(ensemble_size)
+
+    ensemble = rdb_api.add_ensemble(name=f"benchmark_{ensemble_size}")
+    for index in range(ensemble_size):
+        rdb_api.add_realization(index, ensemble.name)
+
+    start = time.perf_counter()
+    _dump_parameters(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        parameters=parameters,
+        ensemble_name=ensemble.name,
+        priors=[],
+    )
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses=responses,
+        ensemble_name=ensemble.name,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\nDumped {ensemble_size} realizations x {NUM_RESPONSE_KEYS} responses "
+        f"x {NUM_TIMESTEPS} timesteps and {NUM_PARAMETER_KEYS} parameters "
+        f"in {elapsed:.3f}s"
+    )
+
+    response = rdb_api.get_response("RESPONSE_0", ensemble_size - 1, ensemble.name)
+    assert blob_api.get_blob(response.values_ref).data == list(
+        responses["RESPONSE_0"][ensemble_size - 1]
+    )
+
+
+# (observation key, response key, number of data points) of the observations
+# in the snake_oil test case
+SNAKE_OIL_OBSERVATIONS = (
+    [("FOPR", "FOPR", NUM_TIMESTEPS)]
+    + [(f"WOPR_OP1_{step}", "WOPR:OP1", 1) for step in (9, 36, 72, 108, 144, 190)]
+    + [("WPR_DIFF_1", "SNAKE_OIL_WPR_DIFF", 4)]
+)
+
+
+@pytest.mark.parametrize("ensemble_size", [25, 100, 400])
+def test_dump_update_data_timing(apis, ensemble_size):
+    rdb_api, blob_api = apis
+    rng = np.random.default_rng(seed=ensemble_size)
+
+    ensemble = rdb_api.add_ensemble(name=f"benchmark_misfits_{ensemble_size}")
+    for index in range(ensemble_size):
+        rdb_api.add_realization(index, ensemble.name)
+    response_keys = {response_key for _, response_key, _ in SNAKE_OIL_OBSERVATIONS}
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses={
+            key: pd.DataFrame(rng.random((NUM_TIMESTEPS, ensemble_size)))
+            for key in response_keys
+        },
+        ensemble_name=ensemble.name,
+    )
+
+    update_data = []
+    for observation_key, response_key, size in SNAKE_OIL_OBSERVATIONS:
+        ref = blob_api.add_blob(list(range(size))).id
+        rdb_api.add_observation(
+            name=f"{observation_key}_{ensemble_size}",
+            key_indexes_ref=ref,
+            data_indexes_ref=ref,
+            values_ref=ref,
+            stds_ref=ref,
+        )
+        update_data.append(
+            {
+                "observation_key": f"{observation_key}_{ensemble_size}",
+                "response_key": response_key,
+                "active": [True] * size,
+                "misfits": dict(enumerate(rng.random(ensemble_size).tolist())),
+            }
+        )
+
+    start = time.perf_counter()
+    _dump_update_data(rdb_api, blob_api, ensemble, update_data)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\nDumped misfits for {len(SNAKE_OIL_OBSERVATIONS)} observations x "
+        f"{ensemble_size} realizations in {elapsed:.3f}s"
+    )
+
+    response = rdb_api.get_response("FOPR", ensemble_size - 1, ensemble.name)
+    assert [misfit.value for misfit in response.misfits] == [
+        update_data[0]["misfits"][ensemble_size - 1]
+    ]
@@ -1,8 +1,10 @@
+import gzip
 import json
 
 import flask
+import numpy as np
 import pytest
-from ert_shared.storage import ERT_STORAGE
+from ert_shared.storage import ERT_STORAGE, blob_encoding, http_compression
 from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.http_server import FlaskWrapper
 from ert_shared.storage.rdb_api import RdbApi
@@ -148,6 +150,31 @@ def test_get_batched_response_missing(test_client):
     assert data_resp.status_code == 404
 
 
+def test_get_batched_response_without_data(test_client):
+    rdb_session = ERT_STORAGE.RdbSession()
+    rdb_api = RdbApi(rdb_session)
+    try:
+        ensemble = rdb_api.add_ensemble(name="no_data_ensemble")
+        rdb_api.add_realization(0, ensemble.name)
+        rdb_api.add_response_definition(
+            name="empty_response", indexes_ref=None, ensemble_name=ensemble.name
+        )
+        rdb_session.commit()
+        url = f"/ensembles/{ensemble.id}/responses/empty_response/data"
+    finally:
+        rdb_session.close()
+
+    data_resp = test_client.get(url)
+    assert data_resp.status_code == 200
+    assert data_resp.data == b""
+
+    data_resp = test_client.get(
+        url, headers={"Accept": blob_encoding.MATRIX_MIMETYPE}
+    )
+    assert data_resp.status_code == 200
+    assert blob_encoding.decode_matrix(data_resp.data).size == 0
+
+
 def test_get_batched_parameter(test_client):
     param_schema = _fetch_parameter(
         test_client,
@@ -164,12 +191,91 @@ def test_get_batched_parameter(test_client):
     assert expected == csv
 
 
+def test_get_batched_response_matrix(test_client):
+    resp_schema = _fetch_response(
+        test_client, ensemble_name="ensemble_name", response_name="response_two"
+    )
+    data_resp = test_client.get(
+        resp_schema["alldata_url"],
+        headers={"Accept": blob_encoding.MATRIX_MIMETYPE},
+    )
+
+    assert data_resp.mimetype == blob_encoding.MATRIX_MIMETYPE
+    matrix = blob_encoding.decode_matrix(data_resp.data)
+    np.testing.assert_array_equal(
+        matrix,
+        [[12.1, 12.2, 11.1, 11.2, 9.9, 9.3], [12.1, 12.2, 11.1, 11.2, 9.9, 9.3]],
+    )
+
+
+def test_get_batched_response_indexed_matrix(test_client):
+    resp_schema = _fetch_response(
+        test_client, ensemble_name="ensemble_name", response_name="response_one"
+    )
+    data_resp = test_client.get(
+        resp_schema["alldata_url"],
+        headers={"Accept": blob_encoding.INDEXED_MATRIX_MIMETYPE},
+    )
+
+    assert data_resp.mimetype == blob_encoding.INDEXED_MATRIX_MIMETYPE
+    indexes, matrix = blob_encoding.decode_indexed_matrix(data_resp.data)
+    np.testing.assert_array_equal(indexes, [0, 1])
+    np.testing.assert_array_equal(
+        matrix, [[11.1, 11.2, 9.9, 9.3], [11.1, 11.2, 9.9, 9.3]]
+    )
+
+
+def test_get_batched_parameter_matrix(test_client):
+    param_schema = _fetch_parameter(
+        test_client,
+        ensemble_name="ensemble_name",
+        parameter_name="A",
+        parameter_group="G",
+    )
+    data_resp = test_client.get(
+        param_schema["alldata_url"],
+        headers={"Accept": blob_encoding.MATRIX_MIMETYPE},
+    )
+
+    assert data_resp.mimetype == blob_encoding.MATRIX_MIMETYPE
+    matrix = blob_encoding.decode_matrix(data_resp.data)
+    np.testing.assert_array_equal(matrix, [[1], [1]])
+
+
 def test_get_batched_parameter_missing(test_client):
     data_url = "/ensembles/1/parameters/42/data"
     data_resp = test_client.get(data_url)
     assert data_resp.status_code == 404
 
 
+def test_ensembles_query_args(test_client):
+    resp = test_client.get("/ensembles?limit=1&fields=name")
+    schema = json.loads(resp.data)
+    assert resp.status_code == 200
+    assert schema["ensembles"] == [{"name": "ensemble_name"}]
+    assert schema["total"] == len(
+        json.loads(test_client.get("/ensembles").data)["ensembles"]
+    )
+
+    resp = test_client.get("/ensembles/1?fields=name,responses&limit=1&offset=1")
+    schema = json.loads(resp.data)
+    assert set(schema) == {"name", "responses"}
+    assert len(schema["responses"]) == 1
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/ensembles?limit=-1",
+        "/ensembles?offset=one",
+        "/ensembles?fields=name,parameters",
+        "/ensembles/1?fields=not_a_field",
+    ],
+)
+def test_ensembles_invalid_query_args(test_client, url):
+    assert test_client.get(url).status_code == 400
+
+
 def _fetch_ensemble(test_client, ensemble_name):
     ensembles_resp = test_client.get("/ensembles")
     ensembles_schema = json.loads(ensembles_resp.data)
@@ -204,3 +310,256 @@ def _fetch_parameter(test_client, ensemble_name, parameter_name, parameter_group
     data = test_client.get(response_url).data
     response_schema = json.loads(data)
     return response_schema
+
+
+def test_etag_not_modified(test_client):
+    resp = test_client.get("/ensembles/1")
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+
+    resp = test_client.get("/ensembles/1", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+
+
+def test_etag_depends_on_format(test_client):
+    url = "/ensembles/1/responses/response_two/data"
+    csv_etag = test_client.get(url).headers["ETag"]
+    npy_resp = test_client.get(url, headers={"Accept": blob_encoding.MATRIX_MIMETYPE})
+
+    assert npy_resp.headers["ETag"] != csv_etag
+    assert npy_resp.mimetype == blob_encoding.MATRIX_MIMETYPE
+
+
+def test_cached_response_is_identical(test_client):
+    first = test_client.get("/ensembles/1/responses/response_one")
+    second = test_client.get("/ensembles/1/responses/response_one")
+
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.data == second.data
+    assert first.mimetype == second.mimetype
+
+
+def test_response_summary_and_misfits(test_client):
+    url = "/ensembles/1/responses/response_one"
+    full = test_client.get(url).get_json()
+    summary = test_client.get(f"{url}/summary").get_json()
+    misfits = test_client.get(f"{url}/misfits").get_json()
+
+    assert summary["observations"] == full["observations"]
+    assert summary["axis"] == full["axis"]
+    assert test_client.get(summary["alldata_url"]).data == (
+        test_client.get(full["alldata_url"]).data
+    )
+    for realization in summary["realizations"]:
+        assert "univariate_misfits" not in realization
+        assert realization["ref_url"].startswith("http://localhost/ensembles/1/")
+
+    assert misfits["total"] == len(full["realizations"])
+    assert [real["univariate_misfits"] for real in misfits["realizations"]] == [
+        real["univariate_misfits"] for real in full["realizations"]
+    ]
+
+    page = test_client.get(f"{url}/misfits?limit=1&offset=1").get_json()
+    assert page["realizations"] == misfits["realizations"][1:2]
+
+    realization = misfits["realizations"][0]["name"]
+    single = test_client.get(f"{url}/misfits?realization={realization}").get_json()
+    assert single["realizations"] == misfits["realizations"][:1]
+
+
+@pytest.mark.parametrize(
+    "url, status",
+    [
+        ("/ensembles/1/responses/none/summary", 404),
+        ("/ensembles/1/responses/none/misfits", 404),
+        ("/ensembles/1/responses/response_one/misfits?realization=x", 400),
+        ("/ensembles/1/responses/response_one/misfits?limit=-1", 400),
+        ("/ensembles/1/responses/response_one/misfits?fields=name", 400),
+    ],
+)
+def test_response_summary_and_misfits_errors(test_client, url, status):
+    assert test_client.get(url).status_code == status
+
+
+def test_compressed_response(test_client, monkeypatch):
+    monkeypatch.setattr(http_compression, "MIN_SIZE", 0)
+    url = "/ensembles/1/responses/response_one"
+    plain = test_client.get(url)
+    headers = {"Accept-Encoding": "gzip"}
+    first = test_client.get(url, headers=headers)
+    second = test_client.get(url, headers=headers)
+
+    assert "Content-Encoding" not in plain.headers
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in first.vary
+    assert first.headers["ETag"] != plain.headers["ETag"]
+    assert gzip.decompress(first.data) == plain.data
+
+    # Served compressed from the cache
+    assert second.headers["Content-Encoding"] == "gzip"
+    assert second.data == first.data
+
+
+def test_compressed_data_stream(test_client):
+    url = "/ensembles/1/responses/response_two/data"
+    plain = test_client.get(url)
+    resp = test_client.get(url, headers={"Accept-Encoding": "gzip"})
+
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.data) == plain.data
+
+
+def test_etag_changes_when_ensemble_is_added(test_client):
+    etag = test_client.get("/ensembles").headers["ETag"]
+
+    rdb_session = ERT_STORAGE.RdbSession()
+    try:
+        RdbApi(rdb_session).add_ensemble(name="etag_ensemble")
+        rdb_session.commit()
+    finally:
+        rdb_session.close()
+
+    resp = test_client.get("/ensembles", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert "etag_ensemble" in [ens["name"] for ens in resp.get_json()["ensembles"]]
+
+
+def test_etag_changes_when_data_is_appended(test_client):
+    rdb_session = ERT_STORAGE.RdbSession()
+    blob_session = ERT_STORAGE.BlobSession()
+    rdb_api = RdbApi(rdb_session)
+    blob_api = BlobApi(blob_session)
+
+    def add_realization(index):
+        rdb_api.add_realization(index, "append_ensemble")
+        rdb_api.add_response(
+            name="append_response",
+            values_ref=blob_api.add_blob([1.0, 2.0]).id,
+            realization_index=index,
+            ensemble_name="append_ensemble",
+        )
+        blob_session.commit()
+        rdb_session.commit()
+
+    try:
+        ensemble = rdb_api.add_ensemble(name="append_ensemble")
+        rdb_api.add_response_definition(
+            name="append_response",
+            indexes_ref=blob_api.add_blob([0, 1]).id,
+            ensemble_name=ensemble.name,
+        )
+        add_realization(0)
+        url = f"/ensembles/{ensemble.id}/responses/append_response"
+
+        resp = test_client.get(url)
+        etag = resp.headers["ETag"]
+        assert [real["name"] for real in resp.get_json()["realizations"]] == [0]
+
+        # Appended like an incremental extraction does
+        add_realization(1)
+        add_realization(2)
+    finally:
+        rdb_session.close()
+        blob_session.close()
+
+    resp = test_client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert [real["name"] for real in resp.get_json()["realizations"]] == [0, 1, 2]
+
+
+def test_etag_depends_on_query_args(test_client):
+    etag = test_client.get("/ensembles/1").headers["ETag"]
+    resp = test_client.get("/ensembles/1?fields=name", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_response_statistics(test_client):
+    resp = test_client.get(
+        "/ensembles/1/responses/response_one/statistics?quantiles=0.5"
+    )
+    assert resp.status_code == 200
+    statistics = resp.get_json()
+    assert statistics["mean"] == [11.1, 11.2, 9.9, 9.3]
+    assert statistics["quantiles"] == [
+        {"quantile": 0.5, "values": [11.1, 11.2, 9.9, 9.3]}
+    ]
+    assert statistics["axis"]["data_url"].startswith("http://localhost/data/")
+
+    url = "/ensembles/1/responses/response_one/statistics?quantiles=median"
+    assert test_client.get(url).status_code == 400
+    url = "/ensembles/1/responses/not_existing/statistics"
+    assert test_client.get(url).status_code == 404
+
+
+def test_batch(test_client):
+    resp = test_client.post(
+        "/batch",
+        json={
+            "urls": [
+                "http://localhost/ensembles/1/responses/response_one",
+                "http://localhost/data/1",
+                "http://localhost/ensembles/1/responses/not_existing",
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    responses = resp.get_json()["responses"]
+
+    assert responses[0]["status"] == 200
+    assert responses[0]["body"]["name"] == "response_one"
+    assert responses[1] == {"status": 200, "mimetype": "text/html", "body": "0,3"}
+    assert responses[2]["status"] == 404
+
+
+def test_batch_ignores_binary_accept(test_client):
+    resp = test_client.post(
+        "/batch",
+        json={
+            "urls": [
+                "http://localhost/data/1",
+                "http://localhost/ensembles/1/responses/response_one/data",
+            ]
+        },
+        headers={"Accept": blob_encoding.MATRIX_MIMETYPE},
+    )
+    assert resp.status_code == 200
+    responses = resp.get_json()["responses"]
+    assert responses[0]["body"] == "0,3"
+    assert responses[1]["mimetype"] == "text/csv"
+
+
+def test_batch_isolates_failing_url(test_client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("broken view")
+
+    monkeypatch.setitem(test_client.application.view_functions, "data", fail)
+    resp = test_client.post(
+        "/batch",
+        json={
+            "urls": [
+                "http://localhost/data/1",
+                "http://localhost/ensembles/1/responses/response_one",
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    responses = resp.get_json()["responses"]
+    assert responses[0]["status"] == 500
+    assert responses[1]["status"] == 200
+
+
+def test_batch_query_args(test_client):
+    resp = test_client.post(
+        "/batch", json={"urls": ["http://localhost/ensembles?limit=1&fields=name"]}
+    )
+    responses = resp.get_json()["responses"]
+    assert responses[0]["status"] == 200
+    assert responses[0]["body"]["ensembles"] == [{"name": "ensemble_name"}]
+
+
+def test_batch_bad_request(test_client):
+    resp = test_client.post("/batch", json={"not_urls": []})
+    assert resp.status_code == 400
@@ -0,0 +1,61 @@
+from ert_shared.storage.http_cache import ResponseCache, make_etag
+
+
+def test_make_etag():
+    assert make_etag("ensemble", 1) == make_etag("ensemble", 1)
+    assert make_etag("ensemble", 1) != make_etag("ensemble", 2)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_size=10)
+    cache.put("a", b"1234", "text/csv")
+    cache.put("b", b"1234", "text/csv")
+    assert cache.get("a") is not None  # "b" is now least recently used
+
+    cache.put("c", b"1234", "text/csv")
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"1234"
+    assert cache.get("c").body == b"1234"
+
+
+def test_too_large_is_not_cached():
+    cache = ResponseCache(max_size=2)
+    cache.put("a", b"1234", "text/csv")
+    assert len(cache) == 0
+
+
+def test_validate_clears_on_new_token():
+    cache = ResponseCache()
+    cache.validate((1, 1, None))
+    cache.put("a", b"{}", "application/json")
+
+    cache.validate((1, 1, None))
+    assert cache.get("a") is not None
+
+    cache.validate((2, 2, None))
+    assert cache.get("a") is None
+
+
+def test_put_stream():
+    cache = ResponseCache()
+    chunks = list(cache.put_stream("a", iter(["1,2", "\n", b"3,4"]), "text/csv"))
+
+    assert chunks == [b"1,2", b"\n", b"3,4"]
+    assert cache.get("a").body == b"1,2\n3,4"
+
+
+def test_abandoned_stream_is_not_cached():
+    cache = ResponseCache()
+    stream = cache.put_stream("a", iter([b"12", b"34"]), "text/csv")
+    next(stream)
+    stream.close()
+    assert cache.get("a") is None
+
+
+def test_too_large_stream_is_not_cached():
+    cache = ResponseCache(max_size=3)
+    assert b"".join(cache.put_stream("a", iter([b"12", b"34"]), "text/csv")) == (
+        b"1234"
+    )
+    assert cache.get("a") is None
@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+from ert_shared.storage import blob_encoding, http_compression
+from flask import Response
+from werkzeug.http import parse_accept_header
+
+
+def accept(header):
+    return parse_accept_header(header)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0", None),
+        ("deflate, gzip;q=0.5", "gzip"),
+    ],
+)
+def test_negotiate(header, expected):
+    assert http_compression.negotiate(accept(header)) == expected
+
+
+def test_compress_response():
+    body = b"1.0," * 1000
+    response = http_compression.compress_response(Response(body), "gzip")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) < len(body)
+    assert gzip.decompress(response.get_data()) == body
+    assert "Accept-Encoding" in response.vary
+
+
+def test_small_response_is_not_compressed():
+    response = http_compression.compress_response(Response(b"1,2,3"), "gzip")
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == b"1,2,3"
+    assert "Accept-Encoding" in response.vary
+
+
+def test_error_is_not_compressed():
+    response = http_compression.compress_response(
+        Response(b"x" * 10000, status=404), "gzip"
+    )
+    assert "Content-Encoding" not in response.headers
+
+
+def test_matrix_is_not_compressed():
+    response = Response(b"x" * 10000, mimetype=blob_encoding.MATRIX_MIMETYPE)
+    response = http_compression.compress_response(response, "gzip")
+    assert "Content-Encoding" not in response.headers
+
+
+def test_compress_stream():
+    chunks = ["1,2,3", "\n", b"4,5,6"] * 100
+    response = Response(iter(chunks), mimetype="text/csv")
+    response = http_compression.compress_response(response, "gzip")
+
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    body = b"".join(response.response)
+    assert gzip.decompress(body) == b"1,2,3\n4,5,6" * 100
+
+
+@pytest.mark.skipif(http_compression.zstandard is None, reason="requires zstandard")
+def test_zstd_is_preferred():
+    assert http_compression.negotiate(accept("gzip, zstd")) == "zstd"
+
+    body = b"1.0," * 1000
+    compressed = http_compression.compress(body, "zstd")
+    assert http_compression.zstandard.ZstdDecompressor().decompress(compressed) == body
@@ -0,0 +1,139 @@
+"""Throughput of the storage server with different worker configurations.
+
+Every configuration starts a server on the same database and requests a set
+of distinct responses from several clients at once. Distinct URLs keep the
+response cache from answering the requests. While they are in flight, a
+healthcheck measures how long a quick request has to wait.
+
+Starting and stopping the servers takes close to a minute, so the benchmark
+only runs when ERT_STORAGE_LOAD_TEST is set:
+`ERT_STORAGE_LOAD_TEST=1 pytest -s tests/storage/test_http_server_load.py`.
+
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from ert_shared.storage import ErtStorage
+from ert_shared.storage.blob_api import BlobApi
+from ert_shared.storage.extraction_api import _dump_response
+from ert_shared.storage.rdb_api import RdbApi
+from ert_shared.storage.server_monitor import ServerMonitor
+
+ENSEMBLE_SIZE = 100
+NUM_RESPONSES = 64
+NUM_TIMESTEPS = 200
+NUM_CLIENTS = 8
+
+pytestmark = pytest.mark.skipif(
+    "ERT_STORAGE_LOAD_TEST" not in os.environ,
+    reason="Set ERT_STORAGE_LOAD_TEST to run the storage server benchmark",
+)
+
+CONFIGURATIONS = {
+    "1 sync worker": ["--workers", "1"],
+    "2 sync workers": ["--workers", "2"],
+    "4 sync workers": ["--workers", "4"],
+    "1 gthread worker x 4 threads": ["--workers", "1", "--worker-class", "gthread"],
+    "2 gthread workers x 4 threads": ["--workers", "2", "--worker-class", "gthread"],
+}
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("load")
+    storage = ErtStorage()
+    storage.initialize(
+        rdb_url=f"sqlite:///{tmp_path}/entities.db",
+        blob_url=f"sqlite:///{tmp_path}/blobs.db",
+    )
+    rdb_api = RdbApi(storage.RdbSession())
+    blob_api = BlobApi(storage.BlobSession())
+    rng = np.random.default_rng(seed=0)
+
+    ensemble = rdb_api.add_ensemble(name="load")
+    for index in range(ENSEMBLE_SIZE):
+        rdb_api.add_realization(index, ensemble.name)
+    _dump_response(
+        rdb_api=rdb_api,
+        blob_api=blob_api,
+        responses={
+            f"RESPONSE_{key}": pd.DataFrame(rng.random((NUM_TIMESTEPS, ENSEMBLE_SIZE)))
+            for key in range(NUM_RESPONSES)
+        },
+        ensemble_name=ensemble.name,
+    )
+
+    # Every response has an observation, so the server computes misfits
+    data_indexes = list(range(0, NUM_TIMESTEPS, 10))
+    data_indexes_ref = blob_api.add_blob(data_indexes).id
+    values_ref = blob_api.add_blob([0.5] * len(data_indexes)).id
+    stds_ref = blob_api.add_blob([0.1] * len(data_indexes)).id
+    for key in range(NUM_RESPONSES):
+        observation = rdb_api.add_observation(
+            name=f"OBS_{key}",
+            key_indexes_ref=data_indexes_ref,
+            data_indexes_ref=data_indexes_ref,
+            values_ref=values_ref,
+            stds_ref=stds_ref,
+        )
+        rdb_api._add_observation_response_definition_link(
+            observation_id=observation.id,
+            response_definition_id=rdb_api._get_response_definition(
+                f"RESPONSE_{key}", ensemble.id
+            ).id,
+            active_ref=None,
+            update_id=None,
+        )
+
+    rdb_api._session.commit()
+    blob_api._session.commit()
+    return storage.rdb_url, storage.blob_url, ensemble.id
+
+
+@pytest.mark.parametrize("configuration", list(CONFIGURATIONS))
+def test_throughput(database, configuration):
+    rdb_url, blob_url, ensemble_id = database
+    server = ServerMonitor(
+        rdb_url=rdb_url,
+        blob_url=blob_url,
+        lockfile=False,
+        server_args=CONFIGURATIONS[configuration],
+    )
+    server.start()
+    try:
+        url = server.fetch_url()
+        session = requests.Session()
+        session.auth = server.fetch_auth()
+        urls = [
+            f"{url}/ensembles/{ensemble_id}/responses/RESPONSE_{key}"
+            for key in range(NUM_RESPONSES)
+        ]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=NUM_CLIENTS) as executor:
+            futures = [
+                executor.submit(session.get, response_url) for response_url in urls
+            ]
+
+            # A quick request should not have to wait for the slow ones
+            healthcheck_start = time.perf_counter()
+            requests.get(f"{url}/healthcheck", auth=session.auth)
+            latency = time.perf_counter() - healthcheck_start
+
+            statuses = [future.result().status_code for future in futures]
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(
+        f"\n{configuration}: {NUM_RESPONSES} responses of {ENSEMBLE_SIZE} "
+        f"realizations for {NUM_CLIENTS} clients in {elapsed:.2f}s "
+        f"({NUM_RESPONSES / elapsed:.1f} requests/s), healthcheck latency "
+        f"{latency:.3f}s"
+    )
+    assert statuses == [200] * NUM_RESPONSES
@@ -0,0 +1,53 @@
+import os
+
+import alembic.command
+import ert_shared.storage
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from ert_shared.storage import ALEMBIC_HEADS, ErtStorage, _current_revisions
+from sqlalchemy import create_engine
+
+
+@pytest.mark.parametrize("ini_section", sorted(ALEMBIC_HEADS))
+def test_alembic_heads_are_up_to_date(ini_section):
+    storage_dir = os.path.dirname(os.path.abspath(ert_shared.storage.__file__))
+    cfg = Config(os.path.join(storage_dir, "alembic.ini"), ini_section=ini_section)
+    cfg.set_section_option(
+        ini_section,
+        "script_location",
+        os.path.join(storage_dir, "alembic", ini_section),
+    )
+    assert ScriptDirectory.from_config(cfg).get_heads() == [ALEMBIC_HEADS[ini_section]]
+
+
+def test_initialize_at_head_skips_alembic(tmp_path, monkeypatch):
+    urls = dict(
+        rdb_url=f"sqlite:///{tmp_path}/entities.db",
+        blob_url=f"sqlite:///{tmp_path}/blobs.db",
+    )
+    ErtStorage().initialize(**urls)
+
+    def upgrade(*args, **kwargs):
+        raise AssertionError("alembic upgrade was run on an up to date database")
+
+    monkeypatch.setattr(alembic.command, "upgrade", upgrade)
+    ErtStorage().initialize(**urls)
+
+
+def test_initialize_upgrades_old_database(tmp_path):
+    blob_url = f"sqlite:///{tmp_path}/blobs.db"
+    storage = ErtStorage()
+    engine = create_engine(blob_url)
+    with engine.connect() as connection:
+        storage._upgrade_database(
+            connection=connection,
+            ini_section="alembic_blob",
+            url=blob_url,
+            revision="a360248166fd",
+        )
+
+    storage.initialize(rdb_url=f"sqlite:///{tmp_path}/entities.db", blob_url=blob_url)
+
+    with engine.connect() as connection:
+        assert _current_revisions(connection) == {ALEMBIC_HEADS["alembic_blob"]}
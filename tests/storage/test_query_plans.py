@@ -0,0 +1,127 @@
+"""Run `EXPLAIN QUERY PLAN` on the queries issued by the RdbApi lookups used
+by extraction and the storage server, and make sure that none of them fall
+back to a full table scan."""
+import re
+
+import pytest
+from sqlalchemy import event
+from tests.storage import db_apis, populated_database, initialize_databases
+
+_FULL_SCAN = re.compile(r"^SCAN (TABLE )?(?P<table>\w+)$")
+
+
+def _lookups(rdb_api, db_lookup):
+    ensemble_id = db_lookup["ensemble"]
+
+    def response_bundle():
+        bundle = rdb_api.get_response_bundle("response_one", ensemble_id)
+        for resp in bundle.responses:
+            resp.realization
+            [misfit.observation_response_definition_link for misfit in resp.misfits]
+        for link in bundle.observation_links:
+            link.observation
+
+    def parameter_bundle():
+        bundle = rdb_api.get_parameter_bundle(
+            db_lookup["parameter_def_A_G"], ensemble_id
+        )
+        for param in bundle.parameters:
+            param.realization
+
+    def ensemble_relations():
+        ensemble = rdb_api.get_ensemble_by_id(ensemble_id)
+        ensemble.parent
+        ensemble.children
+        ensemble.priors
+
+    def observation_relations():
+        observation = rdb_api.get_observation("observation_one")
+        observation.get_attributes()
+        observation.response_definition_links
+
+    return {
+        "get_ensemble": lambda: rdb_api.get_ensemble("ensemble_name"),
+        "get_realization": lambda: rdb_api.get_realization(0, "ensemble_name"),
+        "get_response": lambda: rdb_api.get_response(
+            "response_one", 0, "ensemble_name"
+        ),
+        "get_response_data": lambda: list(
+            rdb_api.get_response_data("response_one", "ensemble_name")
+        ),
+        "get_parameter": lambda: rdb_api.get_parameter("A", "G", 0, "ensemble_name"),
+        "get_observation": lambda: rdb_api.get_observation("observation_one"),
+        "find_prior": lambda: rdb_api.find_prior("group", "key1"),
+        "get_realization_ids": lambda: rdb_api.get_realization_ids(ensemble_id),
+        "get_realizations_by_ensemble_id": lambda: list(
+            rdb_api.get_realizations_by_ensemble_id(ensemble_id)
+        ),
+        "get_response_definitions_by_ensemble_id": lambda: list(
+            rdb_api.get_response_definitions_by_ensemble_id(ensemble_id)
+        ),
+        "get_parameter_definitions_by_ensemble_id": lambda: list(
+            rdb_api.get_parameter_definitions_by_ensemble_id(ensemble_id)
+        ),
+        "get_response_ids": lambda: rdb_api.get_response_ids(ensemble_id),
+        "get_response_data_refs": lambda: rdb_api.get_response_data_refs(
+            "response_one", ensemble_id
+        ),
+        "get_parameter_data_refs": lambda: rdb_api.get_parameter_data_refs(
+            db_lookup["parameter_def_A_G"], ensemble_id
+        ),
+        "get_response_realization_indexes": lambda: rdb_api.get_response_realization_indexes(
+            ensemble_id
+        ),
+        "get_parameter_realization_indexes": lambda: rdb_api.get_parameter_realization_indexes(
+            ensemble_id
+        ),
+        "get_responses": lambda: rdb_api.get_responses(
+            db_lookup["response_defition_one"], realization_index=0
+        ),
+        "count_responses": lambda: rdb_api.count_responses(
+            db_lookup["response_defition_one"]
+        ),
+        "get_response_by_realization_id": lambda: rdb_api.get_response_by_realization_id(
+            db_lookup["response_defition_one"], db_lookup["realization_0"]
+        ),
+        "response_bundle": response_bundle,
+        "parameter_bundle": parameter_bundle,
+        "ensemble_relations": ensemble_relations,
+        "observation_relations": observation_relations,
+    }
+
+
+def _lookup_names():
+    return list(_lookups(None, {"ensemble": None}).keys())
+
+
+@pytest.mark.parametrize("name", _lookup_names())
+def test_no_full_table_scans(db_apis, name):
+    rdb_api, _, db_lookup = db_apis
+    session = rdb_api._session
+    lookup = _lookups(rdb_api, db_lookup)[name]
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        rdb_api.clear_cache()
+        session.expire_all()
+        lookup()
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) > 0
+    for statement, parameters in statements:
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).fetchall()
+        for row in plan:
+            detail = row[-1]
+            assert not _FULL_SCAN.match(detail), "{} scans {}:\n{}".format(
+                name, detail, statement
+            )
@@ -1,8 +1,10 @@
 import time
+from contextlib import contextmanager
 
 import pandas as pd
 import pytest
 import sqlalchemy.exc
+from sqlalchemy import event
 from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.entities_model import Observation
 from ert_shared.storage.rdb_api import RdbApi
@@ -215,6 +217,149 @@ def test_add_parameter(apis):
     assert blob_api.get_blob(id=parameter.value_ref).data == value
 
 
+def test_add_blobs(apis):
+    _, blob_api = apis
+    datas = [[1.1, 2.2], 3, ["2000-01-01 20:01:01"]]
+
+    ids = blob_api.add_blobs(datas)
+
+    assert len(set(ids)) == len(datas)
+    assert [blob_api.get_blob(id).data for id in ids] == datas
+
+
+def test_add_blobs_inserts_with_executemany(apis):
+    _, blob_api = apis
+    datas = [[float(index), 1.5] for index in range(200)]
+
+    with _count_queries(blob_api._session) as statements:
+        ids = blob_api.add_blobs(datas)
+
+    inserts = [statement for statement in statements if statement.startswith("INSERT")]
+    assert len(inserts) == 1
+    assert len(statements) == 3  # Existing blobs, insert and new ids
+    assert [blob.data for blob in blob_api.get_blobs(ids)] == datas
+
+
+def test_add_blob_shares_identical_payloads(apis):
+    _, blob_api = apis
+
+    first = blob_api.add_blob([10.5, 20.5, 30.5])
+    second = blob_api.add_blob([10.5, 20.5, 30.5])
+    other = blob_api.add_blob([10.5, 20.5])
+
+    assert first.id == second.id
+    assert first.ref_count == 2
+    assert other.id != first.id
+    assert other.ref_count == 1
+
+
+def test_add_blobs_shares_identical_payloads(apis):
+    _, blob_api = apis
+    existing = blob_api.add_blob([7.5, 8.5])
+
+    ids = blob_api.add_blobs([[7.5, 8.5], [1.25], [1.25], [7.5, 8.5], [2.25]])
+
+    assert ids[0] == ids[3] == existing.id
+    assert ids[1] == ids[2]
+    assert len(set(ids)) == 3
+    assert blob_api.get_blob(existing.id).ref_count == 3
+    assert blob_api.get_blob(ids[1]).ref_count == 2
+    assert blob_api.get_blob(ids[4]).ref_count == 1
+
+
+def test_delete_blob(apis):
+    _, blob_api = apis
+    blob = blob_api.add_blob(["2001-01-01 01:01:01"])
+    blob_api.add_blob(["2001-01-01 01:01:01"])
+
+    blob_api.delete_blob(blob.id)
+    assert blob_api.get_blob(blob.id).ref_count == 1
+
+    blob_api.delete_blob(blob.id)
+    assert blob_api.get_blob(blob.id) is None
+
+
+def test_get_blobs_in_order(apis):
+    _, blob_api = apis
+    ids = blob_api.add_blobs([[float(index)] for index in range(7)])
+    requested = [ids[4], ids[0], -1, ids[6], ids[0], ids[2], ids[5], ids[1]]
+
+    with _count_queries(blob_api._session) as statements:
+        blobs = list(blob_api.get_blobs(requested, chunk_size=3))
+
+    assert [blob.data for blob in blobs] == [
+        [4.0],
+        [0.0],
+        [6.0],
+        [0.0],
+        [2.0],
+        [5.0],
+        [1.0],
+    ]
+    assert len(statements) == 3
+
+
+def test_get_blobs_streams_in_chunks(apis):
+    _, blob_api = apis
+    ids = blob_api.add_blobs([[float(index), 0.5] for index in range(500)])
+
+    with _count_queries(blob_api._session) as statements:
+        blobs = blob_api.get_blobs(ids[::-1])
+        assert next(blobs).data == [499.0, 0.5]
+        assert sum(1 for _ in blobs) == 499
+
+    assert len(statements) == 1
+
+
+def test_add_responses_bulk(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="test")
+    rdb_api.add_response_definition(
+        name="test", indexes_ref=None, ensemble_name=ensemble.name
+    )
+    for index in range(3):
+        rdb_api.add_realization(index, ensemble.name)
+
+    values = {index: [float(index), 2.0 * index] for index in range(3)}
+    ids = blob_api.add_blobs(values.values())
+
+    rdb_api.add_responses_bulk(
+        name="test",
+        values_refs=dict(zip(values.keys(), ids)),
+        ensemble_name=ensemble.name,
+    )
+
+    for index, expected in values.items():
+        response = rdb_api.get_response("test", index, ensemble.name)
+        assert blob_api.get_blob(response.values_ref).data == expected
+
+
+def test_add_parameters_bulk(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="test")
+    rdb_api.add_parameter_definition(
+        name="test_param", group="test_group", ensemble_name=ensemble.name
+    )
+    for index in range(3):
+        rdb_api.add_realization(index, ensemble.name)
+
+    values = {index: 0.5 * index for index in range(3)}
+    ids = blob_api.add_blobs(values.values())
+
+    rdb_api.add_parameters_bulk(
+        name="test_param",
+        group="test_group",
+        value_refs=dict(zip(values.keys(), ids)),
+        ensemble_name=ensemble.name,
+    )
+
+    for index, expected in values.items():
+        parameter = rdb_api.get_parameter(
+            "test_param", "test_group", index, ensemble.name
+        )
+        assert blob_api.get_blob(parameter.value_ref).data == expected
+
+
 def test_add_observation_response_definition_link(apis):
     rdb_api, blob_api = apis
     observation = rdb_api.add_observation(
@@ -283,6 +428,49 @@ def test_add_mistfit(apis):
     assert misfit.observation_response_definition_link.observation_id == observation.id
 
 
+def test_add_misfits_bulk(apis):
+    rdb_api, blob_api = apis
+    observation = rdb_api.add_observation(
+        name="test",
+        key_indexes_ref=None,
+        data_indexes_ref=None,
+        values_ref=None,
+        stds_ref=None,
+    )
+    ensemble = rdb_api.add_ensemble(name="test")
+    response_definition = rdb_api.add_response_definition(
+        name="test", indexes_ref=None, ensemble_name=ensemble.name
+    )
+    for index in range(3):
+        rdb_api.add_realization(index, ensemble.name)
+    rdb_api.add_responses_bulk(
+        name="test", values_refs={0: 1, 1: 2, 2: 3}, ensemble_name=ensemble.name
+    )
+    link = rdb_api._add_observation_response_definition_link(
+        observation_id=observation.id,
+        response_definition_id=response_definition.id,
+        active_ref=None,
+        update_id=None,
+    )
+
+    response_ids = rdb_api.get_response_ids(ensemble.id)
+    assert list(response_ids) == ["test"]
+    assert sorted(response_ids["test"]) == [0, 1, 2]
+
+    rdb_api._add_misfits_bulk(
+        link_id=link.id,
+        values={
+            response_ids["test"][index]: float(index) for index in response_ids["test"]
+        },
+    )
+
+    for index in range(3):
+        response = rdb_api.get_response("test", index, ensemble.name)
+        assert response.id == response_ids["test"][index]
+        assert [misfit.value for misfit in response.misfits] == [float(index)]
+        assert response.misfits[0].observation_response_definition_link_id == link.id
+
+
 def test_get_parameter_bundle(db_apis):
     rdb_api, blob_api, db_lookup = db_apis
     bundle = rdb_api.get_parameter_bundle(
@@ -308,7 +496,8 @@ def test_get_response_data(db_apis):
     )
     ids = [resp.values_ref for resp in responses]
     assert ids is not None
-    assert ids == [18, 23]
+    # Both realizations have the same values, which are stored once
+    assert ids == [17, 17]
 
 
 def test_get_response_bundle(db_apis):
@@ -374,6 +563,20 @@ def test_get_all_ensembles(db_apis):
     assert ens_list[0].name == "ensemble_name"
 
 
+def test_get_all_ensembles_paginated(apis):
+    rdb_api, _ = apis
+    names = ["page_{}".format(index) for index in range(5)]
+    for name in names:
+        rdb_api.add_ensemble(name=name)
+
+    ensembles = [ens.name for ens in rdb_api.get_all_ensembles()]
+    start = ensembles.index(names[0])
+    page = rdb_api.get_all_ensembles(limit=2, offset=start + 1)
+
+    assert [ens.name for ens in page] == names[1:3]
+    assert rdb_api.count_ensembles() == len(ensembles)
+
+
 def test_get_all_observation_keys(db_apis):
     rdb_api, _, _ = db_apis
     obs_keys = rdb_api.get_all_observation_keys()
@@ -412,3 +615,88 @@ def test_get_parameter(db_apis):
     assert param.parameter_definition.name == "A"
     assert param.parameter_definition.group == "G"
     assert param.realization.index == 0
+
+
+@contextmanager
+def _count_queries(session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_lookup_cache(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="cached")
+    rdb_api.add_response_definition(
+        name="resp", indexes_ref=None, ensemble_name=ensemble.name
+    )
+    for index in range(2):
+        realization = rdb_api.add_realization(index, ensemble.name)
+        rdb_api.add_response(
+            name="resp",
+            values_ref=index,
+            realization_index=index,
+            ensemble_name=ensemble.name,
+        )
+
+    rdb_api.get_response("resp", 0, ensemble.name)
+    with _count_queries(rdb_api._session) as statements:
+        response = rdb_api.get_response("resp", 0, ensemble.name)
+    assert response.values_ref == 0
+    assert len(statements) == 1  # Only the response itself is queried
+
+    with _count_queries(rdb_api._session) as statements:
+        rdb_api.add_response_definition(
+            name="resp2", indexes_ref=None, ensemble_name=ensemble.name
+        )
+        rdb_api.add_response(
+            name="resp2",
+            values_ref=1,
+            realization_index=1,
+            ensemble_name=ensemble.name,
+        )
+    assert not any("FROM ensemble" in statement for statement in statements)
+
+
+def test_lookup_cache_invalidated_by_add_ensemble(apis):
+    rdb_api, blob_api = apis
+    first = rdb_api.add_ensemble(name="same_name")
+    assert rdb_api.get_ensemble("same_name") is first
+
+    time.sleep(1)
+    second = rdb_api.add_ensemble(name="same_name")
+    assert rdb_api.get_ensemble("same_name") is second
+
+
+def test_get_all_ensembles_loads_relatives(apis):
+    rdb_api, _ = apis
+
+    def list_relatives():
+        rdb_api._session.expire_all()
+        with _count_queries(rdb_api._session) as statements:
+            for ensemble in rdb_api.get_all_ensembles():
+                if ensemble.parent is not None:
+                    ensemble.parent.ensemble_reference.name
+                for child in ensemble.children:
+                    child.ensemble_result.name
+        return len(statements)
+
+    rdb_api.add_ensemble(name="prior")
+    rdb_api.add_ensemble(name="update_1", reference=("prior", "ES"))
+    queries = list_relatives()
+
+    for index in range(2, 6):
+        rdb_api.add_ensemble(
+            name="update_{}".format(index),
+            reference=("update_{}".format(index - 1), "ES"),
+        )
+
+    assert list_relatives() == queries
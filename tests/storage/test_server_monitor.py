@@ -1,6 +1,10 @@
 import pytest
 import signal
+import socket
+import threading
+import time
 import requests
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from json import JSONDecodeError
 from textwrap import dedent
 from pathlib import Path
@@ -141,6 +145,8 @@ def test_integration(request, tmpdir):
             f"{server.fetch_url()}/healthcheck", auth=server.fetch_auth()
         )
         assert "date" in resp.json()
+        port = server.fetch_connection_info()["port"]
+        assert server.fetch_url() == f"http://127.0.0.1:{port}"
 
         # Use global connection info
         conn_info = connection.get_info()
@@ -156,3 +162,72 @@ def test_integration(request, tmpdir):
         # Global connection info no longer valid
         with pytest.raises(RuntimeError):
             connection.get_info()
+
+
+@pytest.fixture
+def healthy_url():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def unresponsive_url():
+    """Accepts connections, but never answers"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    sock.close()
+
+
+def test_find_url_returns_first_working_url(healthy_url, unresponsive_url):
+    urls = [unresponsive_url, healthy_url]
+    assert connection.find_url(urls, auth=None, timeout=0.5) == healthy_url
+
+
+def test_find_url_does_not_wait_for_later_urls(healthy_url, unresponsive_url):
+    start = time.perf_counter()
+    urls = [healthy_url, unresponsive_url]
+    assert connection.find_url(urls, auth=None, timeout=5) == healthy_url
+    assert time.perf_counter() - start < 2
+
+
+def test_find_url_probes_concurrently(unresponsive_url):
+    start = time.perf_counter()
+    urls = [unresponsive_url] * 4
+    assert connection.find_url(urls, auth=None, timeout=0.5) is None
+    assert time.perf_counter() - start < 1.5
+
+
+def test_fetch_url_uses_reported_port(healthy_url, monkeypatch):
+    port = int(healthy_url.rsplit(":", 1)[1])
+    probed = []
+    find_url = connection.find_url
+
+    def spy(urls, *args, **kwargs):
+        probed.append(urls)
+        return find_url(urls, *args, **kwargs)
+
+    monkeypatch.setattr(connection, "find_url", spy)
+    server = ServerMonitor.__new__(ServerMonitor)
+    server._url = None
+    server.fetch_connection_info = lambda: {
+        "authtoken": "test123",
+        "urls": ["http://unused.invalid:1"],
+        "port": port,
+    }
+
+    assert server.fetch_url() == f"http://127.0.0.1:{port}"
+    assert probed == [[f"http://127.0.0.1:{port}"]]
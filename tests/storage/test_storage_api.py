@@ -1,8 +1,11 @@
 import json
 
+import numpy as np
+import pandas as pd
 import pytest
 from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.rdb_api import RdbApi
+from ert_shared.storage.storage_api import StorageApi
 from tests.storage import (
     apis,
     db_apis,
@@ -23,6 +26,58 @@ def test_response(storage_api):
     assert schema is None
 
 
+def test_response_summary(storage_api):
+    api, db_lookup = storage_api
+    full = api.get_response(db_lookup["ensemble"], "response_one", None)
+    summary = api.get_response_summary(db_lookup["ensemble"], "response_one")
+
+    for realization in full["realizations"]:
+        del realization["summarized_misfits"]
+        del realization["univariate_misfits"]
+    assert summary == full
+
+    assert (
+        api.get_response_summary(db_lookup["ensemble"], "response_not_existing") is None
+    )
+
+
+def test_response_misfits(storage_api):
+    api, db_lookup = storage_api
+    full = api.get_response(db_lookup["ensemble"], "response_one", None)
+    expected = [
+        {
+            key: realization[key]
+            for key in (
+                "name",
+                "realization_ref",
+                "summarized_misfits",
+                "univariate_misfits",
+            )
+        }
+        for realization in full["realizations"]
+    ]
+
+    misfits = api.get_response_misfits(db_lookup["ensemble"], "response_one")
+    assert misfits["realizations"] == expected
+    assert misfits["total"] == 2
+
+    page = api.get_response_misfits(
+        db_lookup["ensemble"], "response_one", limit=1, offset=1
+    )
+    assert page["realizations"] == expected[1:]
+    assert page["total"] == 2
+
+    single = api.get_response_misfits(
+        db_lookup["ensemble"], "response_one", realization_index=expected[0]["name"]
+    )
+    assert single["realizations"] == expected[:1]
+    assert single["total"] == 1
+
+    assert (
+        api.get_response_misfits(db_lookup["ensemble"], "response_not_existing") is None
+    )
+
+
 def test_ensembles(storage_api):
     api, db_lookup = storage_api
     schema = api.get_ensembles()
@@ -36,6 +91,27 @@ def test_ensembles(storage_api):
     } in schema["ensembles"]
 
 
+def test_ensembles_fields(storage_api):
+    api, db_lookup = storage_api
+    schema = api.get_ensembles(fields=["name", "ensemble_ref"])
+    assert {"name": "ensemble_name", "ensemble_ref": db_lookup["ensemble"]} in schema[
+        "ensembles"
+    ]
+    assert schema["total"] == len(api.get_ensembles()["ensembles"])
+
+    with pytest.raises(ValueError):
+        api.get_ensembles(fields=["name", "realizations"])
+
+
+def test_ensembles_paginated(storage_api):
+    api, _ = storage_api
+    ensembles = api.get_ensembles()["ensembles"]
+
+    schema = api.get_ensembles(limit=1, offset=len(ensembles) - 1)
+    assert schema["ensembles"] == ensembles[-1:]
+    assert schema["total"] == len(ensembles)
+
+
 def test_ensemble(storage_api):
     api, db_lookup = storage_api
     schema = api.get_ensemble(db_lookup["ensemble"])
@@ -165,3 +241,224 @@ def test_data(storage_api):
     assert blob is not None
     blob = api.get_data("non_existing")
     assert blob is None
+
+
+# Realizations may have responses of different lengths, e.g. when some of
+# them stopped early
+@pytest.mark.parametrize("lengths", [[10] * 5, [10, 12, 10, 11, 12]])
+def test_univariate_misfits_for_many_realizations(apis, lengths):
+    rdb_api, blob_api = apis
+    rng = np.random.default_rng(seed=42)
+    responses = [rng.random(length) for length in lengths]
+    obs_values = [0.5, 0.2, 0.8]
+    obs_stds = [0.1, 0.2, 0.3]
+    obs_data_indexes = [1, 4, 9]
+
+    ensemble = rdb_api.add_ensemble(name="misfit_ensemble")
+    response_definition = rdb_api.add_response_definition(
+        name="misfit_response",
+        indexes_ref=blob_api.add_blob(list(range(10))).id,
+        ensemble_name=ensemble.name,
+    )
+    observation = rdb_api.add_observation(
+        name="misfit_obs",
+        key_indexes_ref=blob_api.add_blob(obs_data_indexes).id,
+        data_indexes_ref=blob_api.add_blob(obs_data_indexes).id,
+        values_ref=blob_api.add_blob(obs_values).id,
+        stds_ref=blob_api.add_blob(obs_stds).id,
+    )
+    rdb_api._add_observation_response_definition_link(
+        observation_id=observation.id,
+        response_definition_id=response_definition.id,
+        active_ref=None,
+        update_id=None,
+    )
+    for index, values in enumerate(responses):
+        rdb_api.add_realization(index, ensemble.name)
+        rdb_api.add_response(
+            name="misfit_response",
+            values_ref=blob_api.add_blob(values).id,
+            realization_index=index,
+            ensemble_name=ensemble.name,
+        )
+
+    schema = StorageApi(rdb_api, blob_api).get_response(
+        ensemble.id, "misfit_response", None
+    )
+    json.dumps(schema)
+
+    for realization in schema["realizations"]:
+        values = responses[realization["name"]]
+        assert realization["univariate_misfits"]["misfit_obs"] == [
+            {
+                "value": ((values[index] - obs_value) / obs_std) ** 2,
+                "sign": bool(values[index] - obs_value > 0),
+                "obs_index": obs_index,
+            }
+            for obs_index, (obs_value, obs_std, index) in enumerate(
+                zip(obs_values, obs_stds, obs_data_indexes)
+            )
+        ]
+
+
+def test_get_datas_with_shared_blobs(apis):
+    rdb_api, blob_api = apis
+    ids = blob_api.add_blobs([[4.5, 5.5], [6.5], [4.5, 5.5]]) + [-1]
+
+    datas = list(StorageApi(rdb_api, blob_api).get_datas(ids[::-1]))
+
+    assert datas == [[4.5, 5.5], [6.5], [4.5, 5.5]]
+
+
+def test_ensemble_fields(storage_api):
+    api, db_lookup = storage_api
+    schema = api.get_ensemble(db_lookup["ensemble"], fields=["name", "responses"])
+    assert set(schema) == {"name", "responses"}
+    assert {"name": "response_one", "response_ref": "response_one"} in schema[
+        "responses"
+    ]
+
+    with pytest.raises(ValueError):
+        api.get_ensemble(db_lookup["ensemble"], fields=["not_a_field"])
+
+
+def test_ensemble_paginated(storage_api):
+    api, db_lookup = storage_api
+    ensemble = api.get_ensemble(db_lookup["ensemble"])
+
+    schema = api.get_ensemble(db_lookup["ensemble"], limit=1, offset=1)
+    for key in ("realizations", "responses", "parameters"):
+        assert schema[key] == ensemble[key][1:2]
+
+
+def _add_response(rdb_api, blob_api, name, responses):
+    ensemble = rdb_api.add_ensemble(name=name)
+    rdb_api.add_response_definition(
+        name="stats_response",
+        indexes_ref=blob_api.add_blob(list(range(responses.shape[1]))).id,
+        ensemble_name=ensemble.name,
+    )
+    for index, values in enumerate(responses):
+        rdb_api.add_realization(index, ensemble.name)
+        rdb_api.add_response(
+            name="stats_response",
+            values_ref=blob_api.add_blob(values).id,
+            realization_index=index,
+            ensemble_name=ensemble.name,
+        )
+    return ensemble
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_response_statistics(apis):
+    rdb_api, blob_api = apis
+    responses = np.random.default_rng(seed=42).random((20, 10))
+    # Realizations with different report dates leave missing values
+    responses[3, 2] = np.nan
+    responses[[0, 5, 7], 4] = np.nan
+    responses[1:, 8] = np.nan
+    responses[:, 9] = np.nan
+    ensemble = _add_response(rdb_api, blob_api, "stats_ensemble", responses)
+
+    statistics = StorageApi(rdb_api, blob_api).get_response_statistics(
+        ensemble.id, "stats_response", quantiles=[0.1, 0.5, 0.9]
+    )
+    json.dumps(statistics)
+
+    # Same as the statistics plot computes from the full data
+    data = pd.DataFrame(responses).T
+
+    def values(values):
+        return np.array(values, dtype=np.float64)
+
+    assert statistics["realizations"] == 20
+    np.testing.assert_allclose(values(statistics["mean"]), data.mean(axis=1))
+    np.testing.assert_allclose(values(statistics["std"]), data.std(axis=1))
+    np.testing.assert_allclose(values(statistics["min"]), data.min(axis=1))
+    np.testing.assert_allclose(values(statistics["max"]), data.max(axis=1))
+    assert statistics["mean"][9] is None
+    assert statistics["std"][8] is None
+    assert [quantile["quantile"] for quantile in statistics["quantiles"]] == [
+        0.1,
+        0.5,
+        0.9,
+    ]
+    for quantile in statistics["quantiles"]:
+        np.testing.assert_allclose(
+            values(quantile["values"]), data.quantile(quantile["quantile"], axis=1)
+        )
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_response_statistics_single_realization(apis):
+    rdb_api, blob_api = apis
+    ensemble = _add_response(rdb_api, blob_api, "single", np.array([[1.0, 2.0]]))
+
+    statistics = StorageApi(rdb_api, blob_api).get_response_statistics(
+        ensemble.id, "stats_response"
+    )
+
+    assert statistics["mean"] == [1.0, 2.0]
+    assert statistics["std"] == [None, None]
+    assert len(statistics["quantiles"]) == 5
+
+
+def test_response_statistics_invalid(storage_api):
+    api, db_lookup = storage_api
+    assert api.get_response_statistics(db_lookup["ensemble"], "not_existing") is None
+    with pytest.raises(ValueError):
+        api.get_response_statistics(
+            db_lookup["ensemble"], "response_one", quantiles=[1.5]
+        )
+
+
+def test_response_data_ordered_by_realization(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="unordered")
+    rdb_api.add_response_definition(
+        name="unordered_response", indexes_ref=None, ensemble_name=ensemble.name
+    )
+    # Realization 1 failed, and realization 0 was added after realization 2,
+    # e.g. by an incremental extraction
+    for index in (3, 2, 1, 0):
+        rdb_api.add_realization(index, ensemble.name)
+    for index in (2, 3, 0):
+        rdb_api.add_response(
+            name="unordered_response",
+            values_ref=blob_api.add_blob([float(index)]).id,
+            realization_index=index,
+            ensemble_name=ensemble.name,
+        )
+
+    api = StorageApi(rdb_api, blob_api)
+    refs = api.get_response_data_refs(ensemble.id, "unordered_response")
+
+    assert [index for index, _ in refs] == [0, 2, 3]
+    assert list(api.get_datas([id for _, id in refs])) == [[0.0], [2.0], [3.0]]
+    assert api.get_response_data(ensemble.id, "unordered_response") == [
+        id for _, id in refs
+    ]
+    assert api.get_response_data_refs(ensemble.id, "not_existing") is None
+
+
+def test_parameter_data_refs(storage_api):
+    api, db_lookup = storage_api
+    refs = api.get_parameter_data_refs(
+        db_lookup["ensemble"], db_lookup["parameter_def_A_G"]
+    )
+    assert [index for index, _ in refs] == [0, 1]
+    assert api.get_parameter_data_refs(db_lookup["ensemble"], -1) is None
+
+
+def test_response_data_refs_without_data(apis):
+    rdb_api, blob_api = apis
+    ensemble = rdb_api.add_ensemble(name="no_data")
+    rdb_api.add_realization(0, ensemble.name)
+    rdb_api.add_response_definition(
+        name="empty_response", indexes_ref=None, ensemble_name=ensemble.name
+    )
+
+    api = StorageApi(rdb_api, blob_api)
+    assert api.get_response_data_refs(ensemble.id, "empty_response") == []
+    assert api.get_response_data(ensemble.id, "empty_response") == []
+    assert api.get_response_data_refs(ensemble.id, "not_existing") is None
@@ -7,9 +7,11 @@ from datetime import datetime
 import pandas as pd
 import pytest
 import requests
-from ert_shared.storage import ERT_STORAGE
+from ert_shared.storage import ERT_STORAGE, connection
+from ert_shared.storage.blob_api import BlobApi
 from ert_shared.storage.client import StorageClient
 from ert_shared.storage.http_server import FlaskWrapper
+from ert_shared.storage.rdb_api import RdbApi
 from ert_shared.storage.server_monitor import ServerMonitor
 from flask import Flask, Response, request
 from tests.storage import apis, db_apis, populated_database, initialize_databases
@@ -25,9 +27,30 @@ def server(db_apis, request):
     yield proc
 
 
-@pytest.fixture
-def storage_client(server):
-    yield StorageClient(server.fetch_url(), server.fetch_auth())
+@pytest.fixture(params=["tcp", "unix_socket"])
+def storage_client(server, request):
+    unix_socket = None
+    if request.param == "unix_socket":
+        unix_socket = server.fetch_connection_info()["unix_socket"]
+    yield StorageClient(server.fetch_url(), server.fetch_auth(), unix_socket)
+
+
+def test_unix_socket(server):
+    info = server.fetch_connection_info()
+    client = StorageClient(server.fetch_url(), server.fetch_auth(), info["unix_socket"])
+    url = f"{server.fetch_url()}/ensembles"
+    assert isinstance(client._session.get_adapter(url), connection.UnixSocketAdapter)
+
+    resp = client._session.get(url)
+    assert resp.status_code == 200
+    # Links are built from the Host header, so they point to the TCP address
+    ensembles = resp.json()["ensembles"]
+    assert ensembles
+    for ensemble in ensembles:
+        assert ensemble["ref_url"].startswith(server.fetch_url())
+
+    server.shutdown()
+    assert not os.path.exists(info["unix_socket"])
 
 
 def test_all_keys(storage_client):
@@ -119,3 +142,67 @@ def test_response_values(storage_client):
     ).T
 
     pd.testing.assert_frame_equal(result, expected)
+
+
+def test_data_for_cases(storage_client):
+    for key in ("response_one", "response_two", "G:A"):
+        result = storage_client.data_for_cases(cases=["ensemble_name"], key=key)
+
+        assert list(result) == ["ensemble_name"]
+        pd.testing.assert_frame_equal(
+            result["ensemble_name"],
+            storage_client.data_for_key(case="ensemble_name", key=key),
+        )
+
+    pd.testing.assert_frame_equal(
+        storage_client.data_for_key(case="ensemble_name", key="G:A"),
+        pd.DataFrame([[1], [1]]),
+    )
+
+
+def test_data_for_response_without_data(storage_client):
+    rdb_session = ERT_STORAGE.RdbSession()
+    blob_session = ERT_STORAGE.BlobSession()
+    try:
+        rdb_api = RdbApi(rdb_session)
+        ensemble = rdb_api.add_ensemble(name="no_data_ensemble")
+        rdb_api.add_realization(0, ensemble.name)
+        rdb_api.add_response_definition(
+            name="empty_response",
+            indexes_ref=BlobApi(blob_session).add_blob([0, 1]).id,
+            ensemble_name=ensemble.name,
+        )
+        blob_session.commit()
+        rdb_session.commit()
+    finally:
+        rdb_session.close()
+        blob_session.close()
+
+    result = storage_client.data_for_key(case="no_data_ensemble", key="empty_response")
+    assert result.empty
+
+
+def test_statistics_for_cases(storage_client):
+    result = storage_client.statistics_for_cases(
+        cases=["ensemble_name"], key="response_one"
+    )
+
+    values = [11.1, 11.2, 9.9, 9.3]
+    expected = pd.DataFrame(
+        {
+            "Minimum": values,
+            "Maximum": values,
+            "Mean": values,
+            "Std": [0.0] * 4,
+            "p10": values,
+            "p33": values,
+            "p50": values,
+            "p67": values,
+            "p90": values,
+        },
+        index=[3, 5, 8, 9],
+    )
+    pd.testing.assert_frame_equal(result["ensemble_name"], expected)
+
+    result = storage_client.statistics_for_cases(cases=["ensemble_name"], key="G:A")
+    assert result["ensemble_name"].empty